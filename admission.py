@@ -0,0 +1,121 @@
+import collections
+import contextlib
+import logging
+import math
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+# Raised when a request cannot get a browser slot; carries the HTTP status and
+# the number of seconds the client should wait before retrying
+class Saturated(Exception):
+    def __init__(self, message, status_code, retry_after):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+# Caps how many requests drive a browser at once. Requests beyond the cap wait
+# in a bounded FIFO queue for at most max_wait seconds. A full queue is shed
+# immediately with 429 and a wait that runs out gets 503, both with a
+# Retry-After estimated from how long slots are currently being held.
+class AdmissionController:
+    def __init__(self, slots, max_queue=8, max_wait=20, alpha=0.2):
+        if slots < 1:
+            raise ValueError("slots must be at least 1")
+        self.slots = slots
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.alpha = alpha
+
+        self._lock = threading.Lock()
+        self._queue = collections.deque()
+        self._active = 0
+        self._hold_time = None
+        self._wait_time = 0.0
+        self._max_wait_seen = 0.0
+        self._counters = collections.Counter()
+
+    # Pass acquired=True when the slot was already taken with try_acquire
+    @contextlib.contextmanager
+    def slot(self, acquired=False):
+        if not acquired:
+            self.acquire()
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - started)
+
+    def acquire(self):
+        enqueued = time.monotonic()
+        with self._lock:
+            if self._active < self.slots and not self._queue:
+                self._active += 1
+                self._record_wait(0.0)
+                return
+            if len(self._queue) >= self.max_queue:
+                self._counters['rejected_queue_full'] += 1
+                raise Saturated("Too many transcript requests in progress; please retry later",
+                                429, self._retry_after())
+            waiter = threading.Event()
+            self._queue.append(waiter)
+
+        granted = waiter.wait(self.max_wait)
+        with self._lock:
+            # A release may hand us the slot just after the wait timed out
+            if not granted and not waiter.is_set():
+                self._queue.remove(waiter)
+                self._counters['rejected_timeout'] += 1
+                raise Saturated("Timed out waiting for a free browser; please retry later",
+                                503, self._retry_after())
+            self._record_wait(time.monotonic() - enqueued)
+
+    # Function to take a slot only if one is free right now, without queueing;
+    # used for optional work such as hedged attempts that should not displace requests
+    def try_acquire(self):
+        with self._lock:
+            if self._active < self.slots and not self._queue:
+                self._active += 1
+                self._record_wait(0.0)
+                return True
+            return False
+
+    def release(self, held_for=None):
+        with self._lock:
+            if held_for is not None:
+                self._hold_time = held_for if self._hold_time is None \
+                    else self._hold_time + self.alpha * (held_for - self._hold_time)
+            if self._queue:
+                # Hand the slot straight to the longest waiting request
+                self._queue.popleft().set()
+            else:
+                self._active -= 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'slots': self.slots,
+                'active': self._active,
+                'queue_depth': len(self._queue),
+                'max_queue': self.max_queue,
+                'max_wait_s': self.max_wait,
+                'admitted': self._counters['admitted'],
+                'rejected_queue_full': self._counters['rejected_queue_full'],
+                'rejected_timeout': self._counters['rejected_timeout'],
+                'avg_wait_ms': round(self._wait_time * 1000, 1),
+                'max_wait_ms': round(self._max_wait_seen * 1000, 1),
+                'avg_hold_ms': round(self._hold_time * 1000, 1) if self._hold_time is not None else None,
+            }
+
+    def _record_wait(self, waited):
+        self._counters['admitted'] += 1
+        self._wait_time += self.alpha * (waited - self._wait_time)
+        self._max_wait_seen = max(self._max_wait_seen, waited)
+
+    # Seconds until a slot is likely to be free for a request joining the back of the queue
+    def _retry_after(self):
+        hold_time = self._hold_time if self._hold_time is not None else self.max_wait
+        return max(1, math.ceil(hold_time * (len(self._queue) + 1) / self.slots))
@@ -1,17 +1,43 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 from selenium.webdriver.chrome.service import Service
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException
+from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException
 from werkzeug.exceptions import HTTPException
-import time
 import logging
-import random
 import os
+import atexit
+import collections
+import contextvars
+import itertools
+import json
+import queue
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from driver_pool import DriverPool, reset_driver
+from browser_contexts import BrowserGroup
+from chrome_watchdog import ChromeWatchdog, PROC_AVAILABLE
+from transcript_cache import TranscriptCache, extract_video_id, canonical_video_url
+from transcript_search import TranscriptIndex
+from content_encoding import compress, etag_matches, negotiate_encoding, representation_etag, strong_etag
+from single_flight import SingleFlight
+from notegpt import iter_transcript_chunks, get_stealth_profile, jitter, wait_for_element, TranscriptTruncated
+from upstream_api import UpstreamApi, discard_network_events
+from resource_filter import ResourceFilter, DEFAULT_BLOCKED_PATTERNS, collect_page_load_stats
+from phase_timer import PhaseTimer, PhaseCancelled
+from latency import LatencyTracker
+from circuit_breaker import CircuitBreaker, CircuitOpen
+from metrics import Registry, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from command_trace import CommandTrace, current_trace, trace_driver
+from identity import IdentityManager, DIRECT
+from admission import AdmissionController, Saturated
+from job_queue import SQLiteJobQueue, JobWorker
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -20,23 +46,438 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
 
-# Function to load user agents from a file
-def load_user_agents(file_path):
-    try:
-        with open(file_path, 'r') as f:
-            user_agents = f.readlines()
-        return [ua.strip() for ua in user_agents if ua.strip()]
-    except FileNotFoundError:
-        logger.error(f"User agents file not found: {file_path}")
-        return []
-
-# Function to get a random User-Agent
-def get_random_user_agent(user_agents_file):
-    user_agents = load_user_agents(user_agents_file)
-    if user_agents:
-        return random.choice(user_agents)
-    else:
-        raise ValueError("User agents file is empty or not found")
+CHROMEDRIVER_PATH = os.environ.get('CHROMEDRIVER_PATH', "/usr/local/bin/chromedriver")
+NOTEGPT_URL = os.environ.get('NOTEGPT_URL', 'https://notegpt.io/youtube-video-summarizer')
+
+# Browser multiplexing: 'process' launches a Chrome per pooled driver, 'context' runs
+# CONTEXTS_PER_PROCESS isolated browser contexts in each of CHROME_PROCESSES shared Chromes
+BROWSER_MODE = os.environ.get('BROWSER_MODE', 'process')
+CHROME_PROCESSES = int(os.environ.get('CHROME_PROCESSES', '1'))
+CONTEXTS_PER_PROCESS = int(os.environ.get('CONTEXTS_PER_PROCESS', '4'))
+
+# WebDriver pool configuration
+DRIVER_POOL_MIN_SIZE = int(os.environ.get('DRIVER_POOL_MIN_SIZE', '1'))
+DRIVER_POOL_MAX_SIZE = int(os.environ.get(
+    'DRIVER_POOL_MAX_SIZE', str(CHROME_PROCESSES * CONTEXTS_PER_PROCESS) if BROWSER_MODE == 'context' else '2'))
+DRIVER_POOL_CHECKOUT_TIMEOUT = float(os.environ.get('DRIVER_POOL_CHECKOUT_TIMEOUT', '60'))
+DRIVER_POOL_WARMUP = os.environ.get('DRIVER_POOL_WARMUP', '1') == '1'
+
+# Chrome process watchdog: recycle a Chrome after CHROME_MAX_USES scrapes or above
+# CHROME_MAX_RSS_MB, and sweep for orphaned processes and temp profiles every CHROME_REAP_INTERVAL
+CHROME_WATCHDOG_ENABLED = os.environ.get('CHROME_WATCHDOG_ENABLED', '1') == '1'
+CHROME_MAX_USES = int(os.environ.get('CHROME_MAX_USES', '100'))
+CHROME_MAX_RSS_MB = int(os.environ.get('CHROME_MAX_RSS_MB', '1024'))
+CHROME_REAP_INTERVAL = float(os.environ.get('CHROME_REAP_INTERVAL', '60'))
+CHROME_REAP_GRACE = float(os.environ.get('CHROME_REAP_GRACE', '60'))
+CHROME_PID_DIR = os.environ.get('CHROME_PID_DIR', 'data/chrome_pids')
+
+# Transcript cache configuration
+TRANSCRIPT_CACHE_PATH = os.environ.get('TRANSCRIPT_CACHE_PATH', 'data/transcripts.sqlite3')
+TRANSCRIPT_CACHE_MAX_ENTRIES = int(os.environ.get('TRANSCRIPT_CACHE_MAX_ENTRIES', '256'))
+TRANSCRIPT_CACHE_TTL = float(os.environ.get('TRANSCRIPT_CACHE_TTL', str(7 * 24 * 3600)))
+
+# Coalescing of concurrent scrapes for the same video (lock files are shared by all workers)
+SINGLE_FLIGHT_LOCK_DIR = os.environ.get('SINGLE_FLIGHT_LOCK_DIR', 'data/locks')
+SINGLE_FLIGHT_TIMEOUT = float(os.environ.get('SINGLE_FLIGHT_TIMEOUT', '300'))
+
+# Upper bound on the in-browser scroll and extraction of a single transcript
+TRANSCRIPT_EXTRACT_TIMEOUT = float(os.environ.get('TRANSCRIPT_EXTRACT_TIMEOUT', '120'))
+
+# How often a streaming scrape hands transcript lines back from the browser
+STREAM_CHUNK_MS = int(os.environ.get('STREAM_CHUNK_MS', '500'))
+
+# 'browser' always drives Chrome; 'auto' replays NoteGPT's transcript API directly
+# and falls back to the browser (which relearns the API request) when that fails
+TRANSCRIPT_FETCH_MODE = os.environ.get('TRANSCRIPT_FETCH_MODE', 'browser')
+UPSTREAM_API_RECIPE_PATH = os.environ.get('UPSTREAM_API_RECIPE_PATH', 'data/upstream_api.json')
+UPSTREAM_API_TIMEOUT = float(os.environ.get('UPSTREAM_API_TIMEOUT', '15'))
+
+# Resource filtering for NoteGPT page loads: blocked resource types and URL
+# patterns (comma separated); allowed patterns switch individual blocks back on
+RESOURCE_FILTER_ENABLED = os.environ.get('RESOURCE_FILTER_ENABLED', '1') == '1'
+BLOCKED_RESOURCE_TYPES = os.environ.get('BLOCKED_RESOURCE_TYPES', 'image,media,font')
+BLOCKED_URL_PATTERNS = os.environ.get('BLOCKED_URL_PATTERNS', ','.join(DEFAULT_BLOCKED_PATTERNS))
+ALLOWED_URL_PATTERNS = os.environ.get('ALLOWED_URL_PATTERNS', '')
+# 'normal' waits for the load event on driver.get, 'eager' only for DOMContentLoaded
+PAGE_LOAD_STRATEGY = os.environ.get('PAGE_LOAD_STRATEGY', 'normal')
+
+# Identity rotation: every new browser session gets a User-Agent and, with
+# USE_PROXIES=1, a proxy chosen by health score from PROXIES_FILE
+USER_AGENTS_FILE = os.environ.get('USER_AGENTS_FILE', 'user_agents.txt')
+PROXIES_FILE = os.environ.get('PROXIES_FILE', 'proxies.txt')
+USE_PROXIES = os.environ.get('USE_PROXIES', '0') == '1'
+
+# Admission control: concurrent browser scrapes per worker, plus a bounded wait queue
+BROWSER_SLOTS = int(os.environ.get('BROWSER_SLOTS', str(DRIVER_POOL_MAX_SIZE)))
+ADMISSION_MAX_QUEUE = int(os.environ.get('ADMISSION_MAX_QUEUE', '8'))
+ADMISSION_MAX_WAIT = float(os.environ.get('ADMISSION_MAX_WAIT', '20'))
+
+# Batch endpoint limits; parallelism beyond BROWSER_SLOTS only adds queueing
+BATCH_MAX_SIZE = int(os.environ.get('BATCH_MAX_SIZE', '100'))
+BATCH_PARALLELISM = int(os.environ.get('BATCH_PARALLELISM', str(BROWSER_SLOTS)))
+
+# Durable job queue: lease length, retries, how long finished jobs are kept and how many
+# worker threads this process runs
+JOB_QUEUE_PATH = os.environ.get('JOB_QUEUE_PATH', 'data/jobs.sqlite3')
+JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', '5'))
+JOB_RETRY_BASE = float(os.environ.get('JOB_RETRY_BASE', '5'))
+JOB_RETRY_MAX = float(os.environ.get('JOB_RETRY_MAX', '600'))
+JOB_LEASE_SECONDS = float(os.environ.get('JOB_LEASE_SECONDS', '120'))
+JOB_HEARTBEAT_INTERVAL = float(os.environ.get('JOB_HEARTBEAT_INTERVAL', '30'))
+JOB_WORKER_THREADS = int(os.environ.get('JOB_WORKER_THREADS', '1'))
+JOB_RETENTION = float(os.environ.get('JOB_RETENTION', '604800'))
+
+# Seconds to wait for each NoteGPT page element to show up
+NOTEGPT_WAIT_TIMEOUT = float(os.environ.get('NOTEGPT_WAIT_TIMEOUT', '30'))
+
+# Adaptive waits: once enough scrapes are recorded, each phase waits p99 x factor
+# (at least ADAPTIVE_TIMEOUT_MIN, at most NOTEGPT_WAIT_TIMEOUT) instead of the fixed timeout
+ADAPTIVE_TIMEOUTS = os.environ.get('ADAPTIVE_TIMEOUTS', '1') == '1'
+ADAPTIVE_TIMEOUT_FACTOR = float(os.environ.get('ADAPTIVE_TIMEOUT_FACTOR', '2'))
+ADAPTIVE_TIMEOUT_MIN = float(os.environ.get('ADAPTIVE_TIMEOUT_MIN', '5'))
+LATENCY_WINDOW = int(os.environ.get('LATENCY_WINDOW', '200'))
+LATENCY_MIN_SAMPLES = int(os.environ.get('LATENCY_MIN_SAMPLES', '20'))
+
+# Hedging: start a second scrape on another driver when the first runs past this
+# quantile of its current phase, as long as a browser slot is free
+HEDGE_REQUESTS = os.environ.get('HEDGE_REQUESTS', '0') == '1'
+HEDGE_QUANTILE = float(os.environ.get('HEDGE_QUANTILE', '0.95'))
+
+# Phases whose slowness points at a bad render or exit IP rather than a long transcript.
+# A slow transcript_wait is usually an inaccessible video, which a second browser
+# would only wait out again.
+HEDGED_PHASES = ('page_load', 'generate_click')
+
+# Circuit breaker: consecutive upstream failures that open it, and how long it stays open
+CIRCUIT_BREAKER_ENABLED = os.environ.get('CIRCUIT_BREAKER_ENABLED', '1') == '1'
+CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get('CIRCUIT_FAILURE_THRESHOLD', '5'))
+CIRCUIT_COOLDOWN = float(os.environ.get('CIRCUIT_COOLDOWN', '30'))
+CIRCUIT_COOLDOWN_MAX = float(os.environ.get('CIRCUIT_COOLDOWN_MAX', '300'))
+CIRCUIT_HALF_OPEN_PROBES = int(os.environ.get('CIRCUIT_HALF_OPEN_PROBES', '1'))
+# Transcripts that never appear are usually inaccessible videos, so they take this many
+# distinct videos in a row (e.g. after a changed transcript selector) to open the circuit
+CIRCUIT_TRANSCRIPT_MISSING_THRESHOLD = int(os.environ.get('CIRCUIT_TRANSCRIPT_MISSING_THRESHOLD', '10'))
+
+# WebDriver command tracing: share of scrapes traced at random, the request header
+# that asks for a trace of one /get_transcript call, and where trace files go
+TRACE_SAMPLE_RATE = float(os.environ.get('TRACE_SAMPLE_RATE', '0'))
+TRACE_HEADER = os.environ.get('TRACE_HEADER', 'X-Transcript-Trace')
+TRACE_DIR = os.environ.get('TRACE_DIR', 'data/traces')
+
+# Full-text search over every fetched transcript (kept after cache entries expire)
+SEARCH_INDEX_ENABLED = os.environ.get('SEARCH_INDEX_ENABLED', '1') == '1'
+TRANSCRIPT_INDEX_PATH = os.environ.get('TRANSCRIPT_INDEX_PATH', 'data/transcript_index.sqlite3')
+SEARCH_MAX_RESULTS = int(os.environ.get('SEARCH_MAX_RESULTS', '50'))
+
+# Compressed /get_transcript responses. Compressed bodies are cached with the
+# transcript, so the slow, high levels are only paid once per transcript.
+RESPONSE_COMPRESSION_ENABLED = os.environ.get('RESPONSE_COMPRESSION_ENABLED', '1') == '1'
+COMPRESS_MIN_BYTES = int(os.environ.get('COMPRESS_MIN_BYTES', '1024'))
+GZIP_LEVEL = int(os.environ.get('GZIP_LEVEL', '9'))
+BROTLI_QUALITY = int(os.environ.get('BROTLI_QUALITY', '11'))
+
+# Human-like jitter around page interactions: 'human', 'light' or 'none' (trusted internal traffic)
+stealth_profile = get_stealth_profile(os.environ.get('STEALTH_PROFILE', 'human'))
+
+# Function to build Chrome options for incognito mode and anti-detection measures
+def build_chrome_options(identity):
+    chrome_options = Options()
+    chrome_options.add_argument("--incognito")
+    chrome_options.add_argument("--headless")  # Uncomment for headless mode
+    chrome_options.add_argument('--no-sandbox')
+    chrome_options.add_argument('--disable-dev-shm-usage')
+    chrome_options.add_argument('--disable-gpu')
+    chrome_options.add_argument('--window-size=1920,1080')
+    chrome_options.page_load_strategy = PAGE_LOAD_STRATEGY
+
+    # Set the User-Agent and proxy picked by the identity manager; a shared Chrome
+    # launches without one and gets them per browser context instead
+    if identity is not None:
+        logger.info(f"Using User-Agent: {identity.user_agent}")
+        chrome_options.add_argument(f"user-agent={identity.user_agent}")
+        if identity.proxy != DIRECT:
+            logger.info(f"Using proxy: {identity.proxy}")
+            chrome_options.add_argument(f"--proxy-server={identity.proxy}")
+
+    # Adding extra headers to mimic a legitimate browser request
+    chrome_options.add_argument('accept-language=en-US,en;q=0.9')
+    chrome_options.add_argument('referer=https://www.google.com')
+
+    # Disable WebDriver detection flags
+    chrome_options.add_argument('--disable-blink-features=AutomationControlled')
+    chrome_options.add_experimental_option('excludeSwitches', ['enable-automation'])
+    chrome_options.add_experimental_option('useAutomationExtension', False)
+
+    if resource_filter is not None:
+        resource_filter.apply_to_options(chrome_options)
+
+    # Record network events so the transcript API request can be captured for the fast path
+    if upstream_api is not None:
+        chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+    return chrome_options
+
+# Function to launch a Chrome WebDriver with anti-detection measures applied
+def create_driver():
+    logger.info('Initializing Chrome WebDriver with anti-detection measures')
+    identity = identity_manager.acquire()
+    service = Service(CHROMEDRIVER_PATH)
+    driver = webdriver.Chrome(service=service, options=build_chrome_options(identity))
+    if chrome_watchdog is not None:
+        chrome_watchdog.track(driver)
+    driver.identity = identity
+    # Quit a driver whose setup failed instead of leaking its Chrome
+    try:
+        prepare_driver(driver)
+    except Exception:
+        driver.quit()
+        raise
+    return driver
+
+# Function to apply the per-tab CDP setup every pooled driver needs
+def prepare_driver(driver):
+    # Overriding navigator.webdriver on every document so it survives navigations of pooled drivers
+    driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {
+        'source': "Object.defineProperty(navigator, 'webdriver', {get: () => undefined})"
+    })
+
+    # Keep response bodies available to Network.getResponseBody for API capture
+    if upstream_api is not None:
+        driver.execute_cdp_cmd('Network.enable', {})
+
+    # Skip images, fonts, media, analytics and ads that the scrape never needs
+    if resource_filter is not None:
+        resource_filter.apply(driver)
+
+# Function to launch a Chrome that hosts browser contexts for several concurrent scrapes
+def launch_shared_chrome():
+    logger.info('Initializing shared Chrome WebDriver for browser contexts')
+    driver = webdriver.Chrome(service=Service(CHROMEDRIVER_PATH), options=build_chrome_options(None))
+    if chrome_watchdog is not None:
+        chrome_watchdog.track(driver)
+    return driver
+
+# Function to open a pooled driver as an isolated browser context in a shared Chrome;
+# the proxy is set on the context and the User-Agent on its tab
+def create_context_driver():
+    identity = identity_manager.acquire()
+    options = Options()
+    if upstream_api is not None:
+        options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+    driver = browser_group.open(options, proxy=identity.proxy if identity.proxy != DIRECT else None)
+    driver.identity = identity
+    try:
+        prepare_context(driver)
+    except Exception:
+        driver.quit()
+        raise
+    return driver
+
+# Function to apply the identity and per-tab setup to a browser context's tab
+def prepare_context(driver):
+    driver.execute_cdp_cmd('Network.setUserAgentOverride', {
+        'userAgent': driver.identity.user_agent,
+        'acceptLanguage': 'en-US,en;q=0.9',
+    })
+    prepare_driver(driver)
+
+# Function to clean a context driver on release by moving it to a fresh browser context
+def renew_context(driver):
+    driver.renew(setup=prepare_context)
+
+if TRANSCRIPT_FETCH_MODE not in ('browser', 'auto'):
+    raise ValueError(f"Unknown TRANSCRIPT_FETCH_MODE: {TRANSCRIPT_FETCH_MODE}")
+upstream_api = UpstreamApi(UPSTREAM_API_RECIPE_PATH, timeout=UPSTREAM_API_TIMEOUT) \
+    if TRANSCRIPT_FETCH_MODE == 'auto' else None
+
+# Function to split a comma separated setting into a list
+def split_setting(value):
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+identity_manager = IdentityManager(
+    USER_AGENTS_FILE,
+    proxies_file=PROXIES_FILE,
+    use_proxies=USE_PROXIES,
+)
+
+resource_filter = ResourceFilter(
+    blocked_types=split_setting(BLOCKED_RESOURCE_TYPES),
+    blocked_patterns=split_setting(BLOCKED_URL_PATTERNS),
+    allowed_patterns=split_setting(ALLOWED_URL_PATTERNS),
+) if RESOURCE_FILTER_ENABLED else None
+
+if CHROME_WATCHDOG_ENABLED and not PROC_AVAILABLE:
+    logger.warning('No /proc on this host; the Chrome watchdog is disabled')
+
+chrome_watchdog = ChromeWatchdog(
+    CHROME_PID_DIR,
+    max_uses=CHROME_MAX_USES,
+    max_rss=CHROME_MAX_RSS_MB * 2 ** 20,
+    interval=CHROME_REAP_INTERVAL,
+    grace=CHROME_REAP_GRACE,
+) if CHROME_WATCHDOG_ENABLED and PROC_AVAILABLE else None
+
+if BROWSER_MODE not in ('process', 'context'):
+    raise ValueError(f"Unknown BROWSER_MODE: {BROWSER_MODE}")
+browser_group = BrowserGroup(
+    launch_shared_chrome,
+    processes=CHROME_PROCESSES,
+    contexts_per_process=CONTEXTS_PER_PROCESS,
+    retire=chrome_watchdog.retire_browser if chrome_watchdog is not None else None,
+) if BROWSER_MODE == 'context' else None
+
+# Function to pick how pooled drivers get recycled: a context goes with its shared
+# Chrome, a per-request Chrome on its own use count and memory
+def driver_retire_check():
+    if browser_group is not None:
+        return browser_group.should_retire
+    return chrome_watchdog.retire_driver if chrome_watchdog is not None else None
+
+driver_pool = DriverPool(
+    create_context_driver if browser_group is not None else create_driver,
+    min_size=DRIVER_POOL_MIN_SIZE,
+    max_size=DRIVER_POOL_MAX_SIZE,
+    checkout_timeout=DRIVER_POOL_CHECKOUT_TIMEOUT,
+    reset=renew_context if browser_group is not None else reset_driver,
+    retire=driver_retire_check(),
+)
+# atexit runs in reverse order, so contexts are closed before their shared Chromes
+if browser_group is not None:
+    atexit.register(browser_group.close)
+atexit.register(driver_pool.close)
+
+# Clean up after earlier workers right away, then keep sweeping
+if chrome_watchdog is not None:
+    threading.Thread(target=chrome_watchdog.run_forever, daemon=True).start()
+
+# Pre-launch drivers in the background so the first requests skip Chrome startup
+if DRIVER_POOL_WARMUP:
+    threading.Thread(target=driver_pool.warm_up, daemon=True).start()
+
+admission = AdmissionController(BROWSER_SLOTS, max_queue=ADMISSION_MAX_QUEUE, max_wait=ADMISSION_MAX_WAIT)
+
+transcript_cache = TranscriptCache(
+    TRANSCRIPT_CACHE_PATH,
+    max_entries=TRANSCRIPT_CACHE_MAX_ENTRIES,
+    ttl=TRANSCRIPT_CACHE_TTL,
+)
+
+single_flight = SingleFlight(SINGLE_FLIGHT_LOCK_DIR, timeout=SINGLE_FLIGHT_TIMEOUT)
+
+transcript_index = TranscriptIndex(TRANSCRIPT_INDEX_PATH) if SEARCH_INDEX_ENABLED else None
+
+# Function to cache a freshly fetched transcript and add it to the search index;
+# a failure to index never fails the request
+def store_transcript(video_id, transcript):
+    transcript_cache.set(video_id, transcript)
+    if transcript_index is None:
+        return
+    try:
+        transcript_index.add(video_id, transcript)
+    except Exception:
+        logger.exception(f'Error indexing the transcript of video {video_id}')
+
+# Function to index cached transcripts fetched before the search index existed
+def backfill_transcript_index():
+    indexed = 0
+    for video_id, transcript in transcript_cache.iter_transcripts():
+        if not transcript_index.has(video_id):
+            transcript_index.add(video_id, transcript)
+            indexed += 1
+    if indexed:
+        logger.info(f'Indexed {indexed} cached transcripts for search')
+
+if transcript_index is not None:
+    threading.Thread(target=backfill_transcript_index, daemon=True).start()
+
+latency_tracker = LatencyTracker(
+    window=LATENCY_WINDOW,
+    min_samples=LATENCY_MIN_SAMPLES,
+    factor=ADAPTIVE_TIMEOUT_FACTOR,
+    floor=ADAPTIVE_TIMEOUT_MIN,
+)
+
+circuit_breaker = CircuitBreaker(
+    failure_threshold=CIRCUIT_FAILURE_THRESHOLD,
+    cooldown=CIRCUIT_COOLDOWN,
+    cooldown_max=CIRCUIT_COOLDOWN_MAX,
+    half_open_probes=CIRCUIT_HALF_OPEN_PROBES,
+    enabled=CIRCUIT_BREAKER_ENABLED,
+    suspect_threshold=CIRCUIT_TRANSCRIPT_MISSING_THRESHOLD,
+)
+
+# Function to get the page element timeout for a phase
+def wait_timeout(phase):
+    if not ADAPTIVE_TIMEOUTS:
+        return NOTEGPT_WAIT_TIMEOUT
+    return latency_tracker.timeout(phase, NOTEGPT_WAIT_TIMEOUT)
+
+# Function to wait for the element a phase needs, failing at the phase's timeout. A wait
+# that times out is recorded at its timeout, so once more than 1% of waits hit the adaptive
+# timeout it grows by ADAPTIVE_TIMEOUT_FACTOR instead of failing every slower page.
+def wait_for_phase_element(driver, css_selector, phase, clickable=False):
+    timeout = wait_timeout(phase)
+    try:
+        return wait_for_element(driver, css_selector, timeout, clickable=clickable)
+    except TimeoutException:
+        latency_tracker.record_timeout(phase, timeout)
+        raise
+
+job_queue = SQLiteJobQueue(
+    JOB_QUEUE_PATH,
+    max_attempts=JOB_MAX_ATTEMPTS,
+    retry_base=JOB_RETRY_BASE,
+    retry_max=JOB_RETRY_MAX,
+    retention=JOB_RETENTION or None,
+)
+
+# Prometheus metrics served on /metrics
+metrics_registry = Registry()
+phase_seconds = metrics_registry.histogram(
+    'transcript_phase_seconds', 'Time spent in each phase of a transcript request', ['phase'])
+transcript_outcomes = metrics_registry.counter(
+    'transcript_requests_total', 'Transcript fetches by outcome', ['outcome'])
+transcript_size = metrics_registry.histogram(
+    'transcript_size_bytes', 'Size of the transcripts served', buckets=(1e3, 5e3, 1e4, 5e4, 1e5, 5e5, 1e6))
+metrics_registry.gauge(
+    'transcript_browsers_active', 'Pooled WebDrivers checked out by a scrape',
+    callback=lambda: driver_pool.stats()['in_use'])
+metrics_registry.gauge(
+    'transcript_browsers_pooled', 'WebDrivers in the pool, idle or in use',
+    callback=lambda: driver_pool.stats()['size'])
+metrics_registry.gauge(
+    'transcript_admission_active', 'Browser slots held by scrapes',
+    callback=lambda: admission.stats()['active'])
+metrics_registry.gauge(
+    'transcript_admission_queue_depth', 'Requests waiting for a browser slot',
+    callback=lambda: admission.stats()['queue_depth'])
+metrics_registry.gauge(
+    'transcript_jobs', 'Jobs in the durable queue by status', ['status'],
+    callback=lambda: {(status,): count for status, count in job_queue.stats().items()})
+metrics_registry.gauge(
+    'transcript_chrome_rss_bytes', 'Resident memory of the chromedrivers and Chromes this worker launched',
+    callback=lambda: chrome_watchdog.tracked_rss() if chrome_watchdog is not None else 0)
+metrics_registry.gauge(
+    'transcript_circuit_open', '1 while the circuit breaker rejects scrapes',
+    callback=lambda: int(circuit_breaker.stats()['state'] == 'open'))
+
+# Function to name the outcome of a failed fetch for metrics
+def failure_outcome(e):
+    if isinstance(e, VideoNotAccessible):
+        return 'not_accessible'
+    if isinstance(e, TranscriptTruncated):
+        return 'truncated'
+    if isinstance(e, CircuitOpen):
+        return 'circuit_open'
+    if isinstance(e, Saturated):
+        return 'saturated'
+    if isinstance(e, WebDriverUnavailable):
+        return 'webdriver_unavailable'
+    return 'upstream_error'
+
+# Function to count a transcript that was served, by where it came from
+def record_served(outcome, transcript):
+    transcript_outcomes.inc(outcome=outcome)
+    transcript_size.observe(len(transcript.encode('utf-8')))
 
 @app.errorhandler(HTTPException)
 def handle_http_exception(e):
@@ -51,87 +492,120 @@ def handle_exception(e):
     logger.exception("An unhandled exception occurred")
     return jsonify({'error': 'An internal server error occurred'}), 500
 
-@app.route('/get_transcript', methods=['POST'])
-def get_transcript():
-    try:
-        video_url = request.json.get('video_url')
-        if not video_url:
-            logger.error('No video URL provided')
-            return jsonify({'error': 'No video URL provided'}), 400
-
-        # Initialize Chrome options for incognito mode and anti-detection measures
-        chrome_options = Options()
-        chrome_options.add_argument("--incognito")
-        chrome_options.add_argument("--headless")  # Uncomment for headless mode
-        chrome_options.add_argument('--no-sandbox')
-        chrome_options.add_argument('--disable-dev-shm-usage')
-        chrome_options.add_argument('--disable-gpu')
-        chrome_options.add_argument('--window-size=1920,1080')
+# Function to build the 429/503 response for a request turned away by admission control
+def saturated_response(e):
+    logger.warning(f'Rejecting transcript request: {e}')
+    response = jsonify({'error': str(e), 'retry_after': e.retry_after})
+    response.status_code = e.status_code
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response
 
-        # Set random User-Agent from file
-        try:
-            user_agent = get_random_user_agent('user_agents.txt')
-            logger.info(f"Using User-Agent: {user_agent}")
-            chrome_options.add_argument(f"user-agent={user_agent}")
-        except Exception as e:
-            logger.error(f"Error loading user agents: {e}")
-            return jsonify({'error': 'Error loading user agents'}), 500
+# Raised when NoteGPT never renders a transcript for the requested video
+class VideoNotAccessible(Exception):
+    pass
 
-        # Adding extra headers to mimic a legitimate browser request
-        chrome_options.add_argument('accept-language=en-US,en;q=0.9')
-        chrome_options.add_argument('referer=https://www.google.com')
+# Raised when no WebDriver could be checked out for a scrape
+class WebDriverUnavailable(Exception):
+    pass
 
-        # Disable WebDriver detection flags
-        chrome_options.add_argument('--disable-blink-features=AutomationControlled')
-        chrome_options.add_experimental_option('excludeSwitches', ['enable-automation'])
-        chrome_options.add_experimental_option('useAutomationExtension', False)
+# Function to scrape a transcript from NoteGPT with a pooled WebDriver, yielding
+# lists of lines as the browser hands them back (a single list unless chunk_ms is set).
+# admitted=True means the caller already took the browser slot with try_acquire, and
+# hedged=True leaves the trace to the hedging coordinator.
+def scrape_transcript_chunks(video_id, chunk_ms=None, timer=None, admitted=False, hedged=False):
+    # Fail fast without a browser while the upstream page is known to be broken
+    try:
+        probe = circuit_breaker.acquire()
+    except Exception:
+        if admitted:
+            admission.release()
+        raise
+    try:
+        # Hold a browser slot for the whole scrape so bursts queue or get shed instead of piling up Chromes
+        with admission.slot(acquired=admitted):
+            yield from drive_notegpt(video_id, chunk_ms, timer or PhaseTimer(), hedged)
+    finally:
+        if probe:
+            circuit_breaker.end_probe()
 
-        # Initialize the WebDriver
+# Function to classify why a step of the page flow failed, for the circuit breaker
+def classify_failure(driver, e):
+    if isinstance(e, NoSuchElementException):
+        return 'selector_missing'
+    if isinstance(e, TimeoutException):
+        # A fully loaded page without the element points at a changed selector
         try:
-            logger.info('Initializing Chrome WebDriver with anti-detection measures')
-            service = Service("/usr/local/bin/chromedriver")
-            driver = webdriver.Chrome(service=service, options=chrome_options)
+            loaded = driver.execute_script("return document.readyState") == 'complete'
+        except Exception:
+            loaded = False
+        return 'selector_missing' if loaded else 'timeout'
+    if isinstance(e, WebDriverException) and 'net::ERR_' in (e.msg or ''):
+        return 'navigation'
+    return 'error'
 
-            # Overriding navigator.webdriver to avoid detection
-            driver.execute_script(
-                "Object.defineProperty(navigator, 'webdriver', {get: () => undefined})"
-            )
+# Function to run the NoteGPT page flow for one video on a pooled WebDriver
+def drive_notegpt(video_id, chunk_ms, timer, hedged=False):
+    video_url = canonical_video_url(video_id)
 
-        except Exception as e:
-            logger.exception('Error initializing WebDriver')
-            return jsonify({'error': 'Error initializing WebDriver'}), 500
+    # Check out a warm, pre-configured WebDriver from the pool
+    try:
+        logger.info('Checking out Chrome WebDriver from the pool')
+        with timer.phase('driver_init'):
+            driver = driver_pool.acquire()
+    except Exception as e:
+        logger.exception('Error initializing WebDriver')
+        raise WebDriverUnavailable('Error initializing WebDriver') from e
 
+    # Drop the network events of earlier scrapes on this driver, so they neither pile up
+    # in chromedriver nor get mistaken for this scrape's requests by the API capture
+    if upstream_api is not None:
         try:
-            logger.info('Navigating to NoteGPT YouTube summarizer page')
-            driver.get("https://notegpt.io/youtube-video-summarizer")
+            discard_network_events(driver)
+        except Exception:
+            logger.warning('Could not drain the performance log')
+
+    # Record every WebDriver round-trip if the request asked for a trace or was sampled;
+    # hedged attempts share the trace of their coordinator, which finishes it once
+    trace = current_trace.get()
+    if trace is None and not hedged and TRACE_SAMPLE_RATE and random.random() < TRACE_SAMPLE_RATE:
+        trace = CommandTrace(video_id)
+    untrace = trace_driver(driver, trace) if trace is not None else None
+
+    try:
+        logger.info('Navigating to NoteGPT YouTube summarizer page')
+        with timer.phase('page_load'):
+            driver.get(NOTEGPT_URL)
 
             # Wait for the input field for the YouTube link to be present
-            wait = WebDriverWait(driver, 30)
             logger.info('Waiting for YouTube link input field')
-            youtube_link = wait.until(EC.presence_of_element_located(
-                (By.CSS_SELECTOR, "input[placeholder*='youtube.com']")))
+            youtube_link = wait_for_phase_element(driver, "input[placeholder*='youtube.com']", 'page_load')
+        try:
+            logger.info(f'Page load stats: {collect_page_load_stats(driver)}')
+        except Exception:
+            logger.warning('Could not read page load stats')
 
+        with timer.phase('input'):
             # Enter the YouTube video link
             logger.info(f'Entering video URL: {video_url}')
             youtube_link.send_keys(video_url)
 
-            # Random wait to simulate human behavior
-            time.sleep(random.uniform(2, 5))
+            # Optional human-like pause, as configured by the stealth profile
+            jitter(stealth_profile.typing_pause)
 
+        with timer.phase('generate_click'):
             # Wait for the "Generate Summary" button to be clickable
             logger.info('Waiting for "Generate Summary" button')
-            generate_button = wait.until(EC.element_to_be_clickable(
-                (By.CSS_SELECTOR, "button.el-button.ng-script-btn.el-button--success")))
+            generate_button = wait_for_phase_element(
+                driver, "button.el-button.ng-script-btn.el-button--success", 'generate_click', clickable=True)
 
-            # Simulate human-like behavior with random delays
-            time.sleep(random.uniform(1, 3))
+            jitter(stealth_profile.click_pause)
             generate_button.click()
             logger.info('Clicked "Generate Summary" button')
 
+        with timer.phase('transcript_wait'):
             # Wait for the transcript container to appear
             logger.info('Waiting for transcript container')
-            transcript_container = wait.until(EC.presence_of_element_located(
-                (By.CSS_SELECTOR, "div.ng-transcript")))
+            transcript_container = wait_for_phase_element(driver, "div.ng-transcript", 'transcript_wait')
 
             # Find the inner scrollable div
             # NOTE: Adjusted to match the style from your Inspect snippet: style="height: 288px; overflow-y: auto;"
@@ -140,96 +614,673 @@ def get_transcript():
                 By.CSS_SELECTOR, "div[style*='overflow-y: auto']"
             )
 
-            # Initialize a list to store transcript texts in order
-            transcript_texts = []
-
-            # Scroll to the top of the scrollable div
-            logger.info('Scrolling to the top of the transcript')
-            driver.execute_script("arguments[0].scrollTop = 0;", scrollable_div)
-            time.sleep(2)  # Wait for initial content to load
-
-            # Get the total scroll height
-            total_height = driver.execute_script("return arguments[0].scrollHeight", scrollable_div)
-            viewport_height = driver.execute_script("return arguments[0].clientHeight", scrollable_div)
-            logger.info(f'Total scroll height: {total_height}, Viewport height: {viewport_height}')
-
-            # Initialize scroll position
-            scroll_position = 0
-            # Use a smaller increment so we don't skip items (e.g. 1000 px)
-            scroll_increment = 1500
-            last_position = -1
-
-            # Scroll loop
-            while True:
-                driver.execute_script(
-                    "arguments[0].scrollTop = arguments[1];", 
-                    scrollable_div, 
-                    scroll_position
-                )
-                time.sleep(random.uniform(1.0, 2.0))  # brief wait
-
-                # Grab visible transcript text
-                transcript_divs = scrollable_div.find_elements(
-                    By.CSS_SELECTOR, 
-                    "div.ng-transcript-item-text div.text-container"
-                )
-                for div in transcript_divs:
-                    text = div.text.strip()
-                    if text and text not in transcript_texts:
-                        transcript_texts.append(text)
-
-                # Increase scroll position
-                scroll_position += scroll_increment
-                if scroll_position >= total_height:
-                    logger.info('Reached or exceeded the bottom of the transcript')
-                    break
-
-                # Check if total_height has changed (e.g. dynamic loading)
-                new_total_height = driver.execute_script(
-                    "return arguments[0].scrollHeight", scrollable_div
-                )
-                if new_total_height > total_height:
-                    total_height = new_total_height
-                else:
-                    # If the scroll position didn't change, we've reached the bottom
-                    if scroll_position == last_position:
-                        logger.info('No further scroll movement detected; bottom reached.')
-                        break
-                last_position = scroll_position
-
-            # Final pass at the bottom to ensure all items loaded
-            logger.info('Final pass to capture any remaining transcript items')
-            transcript_divs = scrollable_div.find_elements(
-                By.CSS_SELECTOR, 
-                "div.ng-transcript-item-text div.text-container"
-            )
-            for div in transcript_divs:
-                text = div.text.strip()
-                if text and text not in transcript_texts:
-                    transcript_texts.append(text)
+        # Collect the transcript lines in the browser instead of scrolling from Python
+        logger.info('Extracting transcript items in the browser')
+        transcript_texts = []
+        with timer.phase('extract'):
+            for chunk in iter_transcript_chunks(
+                    driver, scrollable_div, timeout=TRANSCRIPT_EXTRACT_TIMEOUT, stealth=stealth_profile,
+                    chunk_ms=chunk_ms):
+                transcript_texts.extend(chunk)
+                yield chunk
+        logger.info('Transcript extraction completed successfully')
+        logger.info(f'Phase timings for video {video_id}: {timer.summary()}')
+        latency_tracker.record(timer.timings)
+        circuit_breaker.record_success()
+        identity_manager.report(driver.identity, True, latency=timer.timings['page_load'] / 1000)
 
-            # Combine all transcript texts in order
-            full_transcript = "\n".join(transcript_texts)
-            logger.info('Transcript extraction completed successfully')
+        # Learn NoteGPT's transcript request from this run so later requests can skip the browser
+        if upstream_api is not None and transcript_texts and upstream_api.needs_capture():
+            try:
+                upstream_api.learn(driver, video_id, transcript_texts)
+            except Exception:
+                logger.exception('Error capturing the NoteGPT transcript API request')
 
-            # Return the transcript as JSON response
-            return jsonify({'transcript': full_transcript}), 200
+    except TimeoutException as e:
+        # A missing transcript is usually down to the video, which is how private and unavailable
+        # videos show up, so it only counts against the upstream page once it happens to many
+        # videos in a row; a page that never loads or never offers the button counts right away
+        if timer.current == 'transcript_wait':
+            circuit_breaker.record_suspect_failure(
+                timer.current, 'transcript_missing', video_id, 'Timed out waiting for the transcript')
+        else:
+            identity_manager.report(driver.identity, False)
+            circuit_breaker.record_failure(
+                timer.current, classify_failure(driver, e), 'Timed out waiting for the page')
+        logger.error('Transcript container not found. This video might not be accessible.')
+        raise VideoNotAccessible('This video is not accessible. Please provide another video.') from e
 
-        except TimeoutException:
-            logger.error('Transcript container not found. This video might not be accessible.')
-            return jsonify({'error': 'This video is not accessible. Please provide another video.'}), 400
+    except TranscriptTruncated:
+        # The page worked but the transcript outlasted the extraction budget; nothing is cached
+        logger.error(f'Transcript of video {video_id} was cut off by TRANSCRIPT_EXTRACT_TIMEOUT')
+        raise
+
+    except PhaseCancelled:
+        # The other attempt of a hedged scrape won; this says nothing about the exit
+        logger.info(f'Scrape of video {video_id} cancelled during {timer.current}')
+        raise
+
+    except Exception as e:
+        identity_manager.report(driver.identity, False)
+        circuit_breaker.record_failure(timer.current, classify_failure(driver, e),
+                                       (getattr(e, 'msg', None) or str(e))[:200])
+        raise
+
+    finally:
+        for phase, elapsed_ms in timer.timings.items():
+            phase_seconds.observe(elapsed_ms / 1000, phase=phase)
+        if untrace is not None:
+            untrace()
+            if not hedged:
+                finish_trace(trace, timer)
+        # Drivers behind a quarantined proxy are retired so the pool rotates to a healthy one
+        logger.info('Returning the WebDriver to the pool')
+        driver_pool.release(driver, broken=identity_manager.is_quarantined(driver.identity))
+
+# Function to store a finished trace; a failure to write it never fails the scrape
+def finish_trace(trace, timer):
+    trace.add_phases(timer)
+    try:
+        path = trace.save(TRACE_DIR)
+    except OSError:
+        logger.exception('Error writing WebDriver trace')
+        return
+    summary = trace.summary()
+    logger.info(f"WebDriver trace {path}: {summary['round_trips']} round-trips, "
+                f"{summary['command_ms']}ms in commands")
+
+# Function to scrape a whole transcript in one extraction round-trip
+def scrape_transcript(video_id):
+    if HEDGE_REQUESTS:
+        return hedged_scrape_transcript(video_id)
+    # Combine all transcript texts in order
+    return "\n".join(line for chunk in scrape_transcript_chunks(video_id) for line in chunk)
+
+# Function to tell whether a scrape has run past the hedging quantile of its current phase
+def should_hedge(timer):
+    elapsed = timer.elapsed()
+    if elapsed is None or timer.current not in HEDGED_PHASES:
+        return False
+    threshold = latency_tracker.quantile(timer.current, HEDGE_QUANTILE)
+    return threshold is not None and elapsed > threshold
+
+# Function to scrape a transcript with at most one hedged attempt. The first
+# attempt to succeed wins and the other is cancelled at its next phase boundary;
+# a WebDriver command already in progress cannot be interrupted from another thread.
+def hedged_scrape_transcript(video_id):
+    results = queue.Queue()
+    cancel = threading.Event()
+    timers = []
 
+    # Both attempts record into one trace, finished here once the outcome is known
+    trace = current_trace.get()
+    if trace is None and TRACE_SAMPLE_RATE and random.random() < TRACE_SAMPLE_RATE:
+        trace = CommandTrace(video_id)
+
+    def run(timer, admitted):
+        current_trace.set(trace)
+        try:
+            chunks = scrape_transcript_chunks(video_id, timer=timer, admitted=admitted, hedged=True)
+            lines = [line for chunk in chunks for line in chunk]
+            results.put((lines, None, timer))
+        except Exception as e:
+            results.put((None, e, timer))
+
+    def start(admitted=False):
+        timer = PhaseTimer(cancel=cancel)
+        timers.append(timer)
+        threading.Thread(target=contextvars.copy_context().run, args=(run, timer, admitted), daemon=True).start()
+
+    start()
+    pending = 1
+    first_error = None
+    winner = None
+    try:
+        while True:
+            try:
+                lines, error, timer = results.get(timeout=0.1)
+            except queue.Empty:
+                # Hedge only with a slot that is free right now, so hedges never queue ahead of requests
+                if len(timers) == 1 and should_hedge(timers[0]) and admission.try_acquire():
+                    logger.info(f'Hedging scrape of video {video_id}: slow {timers[0].current}')
+                    start(admitted=True)
+                    pending += 1
+                continue
+
+            pending -= 1
+            if error is None:
+                cancel.set()
+                winner = timer
+                return "\n".join(lines)
+            # An inaccessible video stays inaccessible; don't let the other attempt wait it out too
+            if isinstance(error, VideoNotAccessible):
+                cancel.set()
+                winner = timer
+                raise error
+            first_error = first_error or error
+            if pending == 0:
+                raise first_error
+    finally:
+        # The phases of the attempt that decided the outcome; none means no browser was driven
+        timer = winner or timers[0]
+        if trace is not None and timer.spans:
+            finish_trace(trace, timer)
+
+# Function to fetch transcript lines through the replayed NoteGPT API; None means use the browser
+def fetch_transcript_lines_via_api(video_id):
+    if upstream_api is None or not upstream_api.has_recipe():
+        return None
+    try:
+        lines = upstream_api.fetch(video_id)
+        logger.info(f'Fetched transcript for video {video_id} through the NoteGPT API fast path')
+        return lines
+    except Exception as e:
+        logger.warning(f'Transcript API fast path failed for video {video_id}, falling back to the browser: {e}')
+        return None
+
+# Function to get a transcript from the cache, coalescing concurrent scrapes of the same video
+def fetch_transcript(video_id):
+    # Serve popular videos straight from the cache without touching a browser
+    cached_transcript = transcript_cache.get(video_id)
+    if cached_transcript is not None:
+        logger.info(f'Transcript cache hit for video {video_id}')
+        record_served('cache_hit', cached_transcript)
+        return cached_transcript
+
+    def load():
+        # Another worker may have stored the transcript while we waited for the lease
+        cached_transcript = transcript_cache.get(video_id, record_stats=False)
+        if cached_transcript is not None:
+            logger.info(f'Transcript for video {video_id} was fetched by another worker')
+            return cached_transcript
+        lines = fetch_transcript_lines_via_api(video_id)
+        if lines is not None:
+            transcript = "\n".join(lines)
+        else:
+            transcript = scrape_transcript(video_id)
+        store_transcript(video_id, transcript)
+        return transcript
+
+    try:
+        transcript = single_flight.do(video_id, load)
+    except Exception as e:
+        transcript_outcomes.inc(outcome=failure_outcome(e))
+        raise
+    record_served('success', transcript)
+    return transcript
+
+# Function to build the /get_transcript response: a strong ETag derived from the transcript,
+# 304 Not Modified when the client already holds it, and otherwise the body in the best
+# encoding the client accepts, compressed once and then served from the transcript cache
+def transcript_response(video_id, transcript):
+    etag = strong_etag(transcript)
+    encoding = 'identity'
+    if RESPONSE_COMPRESSION_ENABLED:
+        encoding = negotiate_encoding(request.headers.get('Accept-Encoding'))
+
+    if etag_matches(request.headers.get('If-None-Match'), etag):
+        # A 304 has no body, so it carries no Content-Type either
+        response = Response(status=304)
+        del response.headers['Content-Type']
+    else:
+        started = time.perf_counter()
+        body = transcript_cache.get_encoded(video_id, encoding, etag) if encoding != 'identity' else None
+        if body is None:
+            body = jsonify({'transcript': transcript}).get_data()
+            if len(body) < COMPRESS_MIN_BYTES:
+                encoding = 'identity'
+            elif encoding != 'identity':
+                body = compress(body, encoding, gzip_level=GZIP_LEVEL, brotli_quality=BROTLI_QUALITY)
+                transcript_cache.set_encoded(video_id, encoding, etag, body)
+        phase_seconds.observe(time.perf_counter() - started, phase='serialization')
+        response = Response(body, mimetype='application/json')
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+
+    response.headers['ETag'] = representation_etag(etag, encoding)
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
+@app.route('/get_transcript', methods=['GET', 'POST'])
+def get_transcript():
+    try:
+        # GET takes the URL as a query parameter, so HTTP caches can revalidate it
+        if request.method == 'GET':
+            video_url = request.args.get('video_url')
+        else:
+            video_url = request.json.get('video_url')
+        if not video_url:
+            logger.error('No video URL provided')
+            return jsonify({'error': 'No video URL provided'}), 400
+
+        video_id = extract_video_id(video_url)
+        if not video_id:
+            logger.error(f'Could not parse a YouTube video ID from: {video_url}')
+            return jsonify({'error': 'Invalid YouTube video URL'}), 400
+
+        # A trace is only recorded if this request ends up driving the browser itself
+        trace = CommandTrace(video_id) if request.headers.get(TRACE_HEADER) == '1' else None
+        trace_token = current_trace.set(trace)
+        try:
+            full_transcript = fetch_transcript(video_id)
+        except Saturated as e:
+            return saturated_response(e)
+        except WebDriverUnavailable:
+            return jsonify({'error': 'Error initializing WebDriver'}), 500
+        except VideoNotAccessible:
+            return jsonify({'error': 'This video is not accessible. Please provide another video.'}), 400
+        except TranscriptTruncated as e:
+            return jsonify({'error': str(e)}), 504
         except Exception as e:
             logger.exception('An error occurred during processing')
             return jsonify({'error': 'An internal error occurred during processing'}), 500
-
         finally:
-            logger.info('Closing the WebDriver')
-            driver.quit()
+            current_trace.reset(trace_token)
+
+        # Return the transcript as JSON response, with the trace summary if one was taken
+        if trace is None or trace.path is None:
+            return transcript_response(video_id, full_transcript)
+        body = {'transcript': full_transcript, 'trace': trace.summary()}
+        started = time.perf_counter()
+        response = jsonify(body)
+        phase_seconds.observe(time.perf_counter() - started, phase='serialization')
+        return response, 200
 
     except Exception as e:
         logger.exception('An unexpected error occurred in get_transcript')
         return jsonify({'error': 'An internal server error occurred'}), 500
 
+# Function to yield (source, lines) chunks of a transcript as soon as they are available.
+# The scrape runs under the same single-flight as fetch_transcript, so a stream either
+# drives the browser itself or waits on a scrape another request already started.
+def stream_transcript_chunks(video_id):
+    cached_transcript = transcript_cache.get(video_id)
+    if cached_transcript is not None:
+        logger.info(f'Transcript cache hit for video {video_id}')
+        record_served('cache_hit', cached_transcript)
+        yield 'cache', split_transcript(cached_transcript)
+        return
+
+    chunks = queue.Queue()
+    scraped = threading.Event()
+
+    def load():
+        cached_transcript = transcript_cache.get(video_id, record_stats=False)
+        if cached_transcript is not None:
+            return cached_transcript
+        scraped.set()
+        lines = fetch_transcript_lines_via_api(video_id)
+        if lines is not None:
+            chunks.put(('api', lines))
+        else:
+            lines = []
+            for chunk in scrape_transcript_chunks(video_id, chunk_ms=STREAM_CHUNK_MS):
+                lines.extend(chunk)
+                chunks.put(('scrape', chunk))
+        transcript = "\n".join(lines)
+        store_transcript(video_id, transcript)
+        return transcript
+
+    # Keep scraping in the background so the cache is filled even if the client disconnects
+    def run():
+        try:
+            transcript = single_flight.do(video_id, load)
+            record_served('success', transcript)
+            if not scraped.is_set():
+                chunks.put(('coalesced', split_transcript(transcript)))
+            chunks.put(None)
+        except Exception as e:
+            transcript_outcomes.inc(outcome=failure_outcome(e))
+            chunks.put(e)
+
+    threading.Thread(target=contextvars.copy_context().run, args=(run,), daemon=True).start()
+    while True:
+        item = chunks.get()
+        if item is None:
+            return
+        if isinstance(item, Exception):
+            raise item
+        yield item
+
+# Function to split a stored transcript back into its lines
+def split_transcript(transcript):
+    return transcript.split("\n") if transcript else []
+
+# Function to render one streaming record as an NDJSON line or a Server-Sent Event
+def format_stream_record(record, sse):
+    payload = json.dumps(record)
+    if sse:
+        return f"event: {record['type']}\ndata: {payload}\n\n"
+    return payload + "\n"
+
+@app.route('/get_transcript/stream', methods=['POST'])
+def get_transcript_stream():
+    video_url = (request.json or {}).get('video_url')
+    if not video_url:
+        logger.error('No video URL provided')
+        return jsonify({'error': 'No video URL provided'}), 400
+
+    video_id = extract_video_id(video_url)
+    if not video_id:
+        logger.error(f'Could not parse a YouTube video ID from: {video_url}')
+        return jsonify({'error': 'Invalid YouTube video URL'}), 400
+
+    sse = 'text/event-stream' in request.headers.get('Accept', '')
+    started = time.monotonic()
+    chunks = stream_transcript_chunks(video_id)
+
+    # Wait for the first chunk before answering, so a saturated or failed scrape
+    # still gets the same status code as /get_transcript
+    try:
+        first_chunk = next(chunks, None)
+    except Saturated as e:
+        return saturated_response(e)
+    except VideoNotAccessible as e:
+        return jsonify({'error': str(e)}), 400
+    except TranscriptTruncated as e:
+        return jsonify({'error': str(e)}), 504
+    except WebDriverUnavailable:
+        return jsonify({'error': 'Error initializing WebDriver'}), 500
+    except Exception:
+        logger.exception('An error occurred while streaming the transcript')
+        return jsonify({'error': 'An internal error occurred during processing'}), 500
+    if first_chunk is not None:
+        chunks = itertools.chain([first_chunk], chunks)
+
+    def generate():
+        first_segment_ms = None
+        segments = 0
+        characters = 0
+        source = None
+        try:
+            for source, lines in chunks:
+                if first_segment_ms is None and lines:
+                    first_segment_ms = round((time.monotonic() - started) * 1000, 1)
+                for line in lines:
+                    yield format_stream_record({'type': 'segment', 'index': segments, 'text': line}, sse)
+                    segments += 1
+                    characters += len(line)
+        except (VideoNotAccessible, TranscriptTruncated) as e:
+            yield format_stream_record({'type': 'error', 'error': str(e)}, sse)
+            return
+        except WebDriverUnavailable:
+            yield format_stream_record({'type': 'error', 'error': 'Error initializing WebDriver'}, sse)
+            return
+        except Exception:
+            logger.exception('An error occurred while streaming the transcript')
+            yield format_stream_record(
+                {'type': 'error', 'error': 'An internal error occurred during processing'}, sse)
+            return
+
+        yield format_stream_record({
+            'type': 'complete',
+            'video_id': video_id,
+            'source': source or 'scrape',
+            'segments': segments,
+            'characters': characters,
+            'timings': {
+                'first_segment_ms': first_segment_ms,
+                'total_ms': round((time.monotonic() - started) * 1000, 1),
+            },
+        }, sse)
+
+    mimetype = 'text/event-stream' if sse else 'application/x-ndjson'
+    return Response(generate(), mimetype=mimetype, headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
+
+# Function to fetch one batch item, turning failures into per-item errors so one
+# inaccessible video cannot fail the rest of the batch
+def fetch_batch_item(video_id, video_urls):
+    item = {'video_id': video_id, 'video_urls': video_urls}
+    try:
+        item.update(status='ok', status_code=200, transcript=fetch_transcript(video_id))
+    except Saturated as e:
+        item.update(status='error', status_code=e.status_code, error=str(e), retry_after=e.retry_after)
+    except VideoNotAccessible as e:
+        item.update(status='error', status_code=400, error=str(e))
+    except TranscriptTruncated as e:
+        item.update(status='error', status_code=504, error=str(e))
+    except WebDriverUnavailable:
+        item.update(status='error', status_code=500, error='Error initializing WebDriver')
+    except Exception:
+        logger.exception(f'An error occurred while fetching video {video_id} in a batch')
+        item.update(status='error', status_code=500, error='An internal error occurred during processing')
+    return item
+
+# Function to fan a batch out over parallel workers, yielding items as they complete
+def iter_batch_results(video_ids, invalid_urls, parallelism):
+    for video_url in invalid_urls:
+        yield {'video_id': None, 'video_urls': [video_url], 'status': 'error', 'status_code': 400,
+               'error': 'Invalid YouTube video URL'}
+    if not video_ids:
+        return
+    executor = ThreadPoolExecutor(max_workers=min(parallelism, len(video_ids)),
+                                  thread_name_prefix='batch')
+    try:
+        futures = [executor.submit(fetch_batch_item, video_id, urls) for video_id, urls in video_ids.items()]
+        for future in as_completed(futures):
+            yield future.result()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+@app.route('/get_transcripts', methods=['POST'])
+def get_transcripts():
+    payload = request.json or {}
+    video_urls = payload.get('video_urls')
+    if not isinstance(video_urls, list) or not video_urls:
+        logger.error('No video URLs provided')
+        return jsonify({'error': 'No video URLs provided'}), 400
+    if len(video_urls) > BATCH_MAX_SIZE:
+        return jsonify({'error': f'A batch can contain at most {BATCH_MAX_SIZE} video URLs'}), 400
+
+    # Deduplicate by video ID, remembering every URL that asked for it
+    video_ids = collections.OrderedDict()
+    invalid_urls = []
+    for video_url in video_urls:
+        video_id = extract_video_id(video_url) if isinstance(video_url, str) else None
+        if video_id:
+            video_ids.setdefault(video_id, []).append(video_url)
+        else:
+            invalid_urls.append(video_url)
+
+    try:
+        parallelism = int(payload.get('parallelism', BATCH_PARALLELISM))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'parallelism must be an integer'}), 400
+    parallelism = max(1, min(parallelism, BATCH_PARALLELISM))
+    logger.info(f'Fetching a batch of {len(video_ids)} videos with parallelism {parallelism}')
+
+    started = time.monotonic()
+    results = iter_batch_results(video_ids, invalid_urls, parallelism)
+
+    def summary(succeeded, failed):
+        return {
+            'requested': len(video_urls),
+            'unique': len(video_ids),
+            'invalid': len(invalid_urls),
+            'succeeded': succeeded,
+            'failed': failed,
+            'elapsed_ms': round((time.monotonic() - started) * 1000, 1),
+        }
+
+    if payload.get('stream'):
+        def generate():
+            succeeded = failed = 0
+            for item in results:
+                if item['status'] == 'ok':
+                    succeeded += 1
+                else:
+                    failed += 1
+                yield json.dumps(dict(item, type='item')) + "\n"
+            yield json.dumps(dict(summary(succeeded, failed), type='complete')) + "\n"
+
+        return Response(generate(), mimetype='application/x-ndjson', headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no',
+        })
+
+    # Return items in request order even though they complete out of order
+    by_id = {}
+    errors = []
+    for item in results:
+        if item['video_id'] is None:
+            errors.append(item)
+        else:
+            by_id[item['video_id']] = item
+    ordered = [by_id[video_id] for video_id in video_ids] + errors
+    succeeded = sum(1 for item in ordered if item['status'] == 'ok')
+    return jsonify({'results': ordered, 'summary': summary(succeeded, len(ordered) - succeeded)}), 200
+
+# Function run by job workers: the same cached, coalesced fetch as /get_transcript
+def run_transcript_job(job):
+    return fetch_transcript(job['video_id'])
+
+# Function to decide whether a failed job is worth another attempt; a video
+# NoteGPT cannot render will not start working on a retry
+def is_retryable_job_error(e):
+    return not isinstance(e, VideoNotAccessible)
+
+# Function to build a job worker that pulls from the shared queue
+def create_job_worker():
+    return JobWorker(
+        job_queue,
+        run_transcript_job,
+        lease_seconds=JOB_LEASE_SECONDS,
+        heartbeat_interval=JOB_HEARTBEAT_INTERVAL,
+        is_retryable=is_retryable_job_error,
+    )
+
+# Function to describe a job for API responses
+def job_response(job):
+    body = {
+        'job_id': job['id'],
+        'video_id': job['video_id'],
+        'status': job['status'],
+        'attempts': job['attempts'],
+        'max_attempts': job['max_attempts'],
+        'created_at': job['created_at'],
+        'updated_at': job['updated_at'],
+    }
+    if job['status'] == 'queued' and job['attempts']:
+        body['retry_at'] = job['available_at']
+    if job['status'] == 'succeeded':
+        body['transcript'] = job['result']
+    elif job['error']:
+        body['error'] = job['error']
+    return body
+
+@app.route('/jobs', methods=['POST'])
+def create_job():
+    video_url = (request.json or {}).get('video_url')
+    if not video_url:
+        logger.error('No video URL provided')
+        return jsonify({'error': 'No video URL provided'}), 400
+
+    video_id = extract_video_id(video_url)
+    if not video_id:
+        logger.error(f'Could not parse a YouTube video ID from: {video_url}')
+        return jsonify({'error': 'Invalid YouTube video URL'}), 400
+
+    # Cached transcripts are returned as an already finished job
+    job = job_queue.enqueue(video_id, result=transcript_cache.get(video_id))
+    logger.info(f"Job {job['id']} for video {video_id} is {job['status']}")
+    response = jsonify(job_response(job))
+    response.status_code = 200 if job['status'] == 'succeeded' else 202
+    response.headers['Location'] = f"/jobs/{job['id']}"
+    return response
+
+@app.route('/jobs/stats', methods=['GET'])
+def job_stats():
+    return jsonify(job_queue.stats()), 200
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job_response(job)), 200
+
+# Run job workers in the web process too; worker.py runs them on their own
+for _ in range(JOB_WORKER_THREADS):
+    threading.Thread(target=create_job_worker().run_forever, daemon=True).start()
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    return Response(metrics_registry.render(), content_type=METRICS_CONTENT_TYPE)
+
+@app.route('/admission', methods=['GET'])
+def admission_stats():
+    return jsonify(admission.stats()), 200
+
+@app.route('/browsers', methods=['GET'])
+def browser_stats():
+    return jsonify({
+        'mode': BROWSER_MODE,
+        'pool': driver_pool.stats(),
+        'shared_chromes': browser_group.stats() if browser_group is not None else None,
+        'watchdog': chrome_watchdog.stats() if chrome_watchdog is not None else None,
+    }), 200
+
+@app.route('/latency', methods=['GET'])
+def latency_stats():
+    return jsonify({
+        'adaptive_timeouts': ADAPTIVE_TIMEOUTS,
+        'hedging': HEDGE_REQUESTS,
+        'phases': latency_tracker.stats(ceiling=NOTEGPT_WAIT_TIMEOUT),
+    }), 200
+
+@app.route('/circuit', methods=['GET'])
+def circuit_stats():
+    return jsonify(circuit_breaker.stats()), 200
+
+@app.route('/circuit/reset', methods=['POST'])
+def reset_circuit():
+    circuit_breaker.reset()
+    logger.info('Circuit breaker reset')
+    return jsonify(circuit_breaker.stats()), 200
+
+@app.route('/identities', methods=['GET'])
+def identity_stats():
+    return jsonify(identity_manager.stats()), 200
+
+@app.route('/search', methods=['GET'])
+def search_transcripts():
+    if transcript_index is None:
+        return jsonify({'error': 'Transcript search is disabled'}), 404
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'No search query provided'}), 400
+    try:
+        limit = min(max(int(request.args.get('limit', '20')), 1), SEARCH_MAX_RESULTS)
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+
+    started = time.perf_counter()
+    try:
+        results = transcript_index.search(query, limit=limit)
+    except sqlite3.OperationalError as e:
+        return jsonify({'error': f'Invalid search query: {e}'}), 400
+    took_ms = round((time.perf_counter() - started) * 1000, 1)
+    return jsonify({'query': query, 'took_ms': took_ms, 'results': results}), 200
+
+@app.route('/search/stats', methods=['GET'])
+def search_stats():
+    if transcript_index is None:
+        return jsonify({'error': 'Transcript search is disabled'}), 404
+    return jsonify(transcript_index.stats()), 200
+
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    return jsonify(transcript_cache.stats()), 200
+
+@app.route('/cache/<video_id>', methods=['DELETE'])
+def invalidate_cached_transcript(video_id):
+    video_id = extract_video_id(video_id) or video_id
+    removed = transcript_cache.invalidate(video_id)
+    logger.info(f'Invalidated cached transcript for video {video_id}: {removed}')
+    return jsonify({'video_id': video_id, 'invalidated': removed}), 200
+
 if __name__ == '__main__':
     app.run(debug=False, host='0.0.0.0')
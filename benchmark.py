@@ -0,0 +1,217 @@
+import argparse
+import json
+import logging
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from chrome_watchdog import tree_rss
+
+# Drives /get_transcript at a fixed concurrency and reports latency percentiles,
+# throughput, peak RSS of the service's process tree (gunicorn, chromedriver and
+# Chrome) and WebDriver round-trips per scrape, read from the trace summary the
+# service attaches when asked with the trace header. With --spawn it starts
+# notegpt_standin.py and the service itself, so it runs offline and in CI.
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+# Function to get the q-quantile of a sorted list
+def percentile(values, q):
+    if not values:
+        return None
+    return values[min(len(values) - 1, max(0, math.ceil(q * len(values)) - 1))]
+
+
+# Samples the RSS of a process tree in the background and keeps the peak
+class RssSampler(threading.Thread):
+    def __init__(self, pid, interval=0.2):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.peak = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            self.peak = max(self.peak, tree_rss(self.pid))
+            self._stop_event.wait(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+# Function to poll a URL until it answers, so spawned servers are ready before the run
+def wait_until_up(url, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(url, timeout=2)
+            return
+        except urllib.error.HTTPError:
+            return
+        except (urllib.error.URLError, OSError):
+            time.sleep(0.25)
+    raise RuntimeError(f'{url} did not come up within {timeout}s')
+
+
+# Function to start the stand-in and the service with settings suited to benchmarking
+def spawn_servers(args, workdir):
+    standin = subprocess.Popen([
+        sys.executable, os.path.join(HERE, 'notegpt_standin.py'),
+        '--port', str(args.standin_port),
+        '--lines', str(args.lines),
+        '--page-size', str(args.page_size),
+        '--render-delay-ms', str(args.render_delay_ms),
+        '--api-delay-ms', str(args.api_delay_ms),
+    ] + (['--virtualized'] if args.virtualized else []), cwd=HERE)
+    wait_until_up(f'http://127.0.0.1:{args.standin_port}/youtube-video-summarizer')
+
+    env = dict(os.environ)
+    env.update({
+        'NOTEGPT_URL': f'http://127.0.0.1:{args.standin_port}/youtube-video-summarizer',
+        'STEALTH_PROFILE': 'none',
+        'TRANSCRIPT_CACHE_PATH': os.path.join(workdir, 'transcripts.sqlite3'),
+        'SINGLE_FLIGHT_LOCK_DIR': os.path.join(workdir, 'locks'),
+        'JOB_QUEUE_PATH': os.path.join(workdir, 'jobs.sqlite3'),
+        'UPSTREAM_API_RECIPE_PATH': os.path.join(workdir, 'upstream_api.json'),
+        'TRACE_DIR': os.path.join(workdir, 'traces'),
+        'CHROME_PID_DIR': os.path.join(workdir, 'chrome_pids'),
+        'TRANSCRIPT_INDEX_PATH': os.path.join(workdir, 'transcript_index.sqlite3'),
+        'JOB_WORKER_THREADS': '0',
+    })
+    service = subprocess.Popen([
+        sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{args.app_port}',
+        '--worker-class', 'gthread', '--workers', '1', '--threads', str(max(args.concurrency * 2, 4)),
+        '--timeout', '300', 'app:app',
+    ], cwd=HERE, env=env)
+    wait_until_up(f'http://127.0.0.1:{args.app_port}/admission', timeout=120)
+    return standin, service
+
+
+# Function to request one transcript and return (status, seconds, round_trips)
+def fetch(base_url, video_id, timeout):
+    body = json.dumps({'video_url': f'https://www.youtube.com/watch?v={video_id}'}).encode()
+    req = urllib.request.Request(f'{base_url}/get_transcript', data=body, method='POST', headers={
+        'Content-Type': 'application/json',
+        'X-Transcript-Trace': '1',
+    })
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as response:
+            payload = json.loads(response.read())
+            status = response.status
+    except urllib.error.HTTPError as e:
+        e.read()
+        return e.code, time.perf_counter() - started, None
+    except (urllib.error.URLError, OSError):
+        return 'connection_error', time.perf_counter() - started, None
+    elapsed = time.perf_counter() - started
+    trace = payload.get('trace') or {}
+    return status, elapsed, trace.get('round_trips')
+
+
+# Function to run the benchmark and build its report
+def run(args):
+    # Distinct 11-character video IDs, so every request misses the cache and scrapes
+    video_ids = [f'bench{index:06d}' for index in range(args.warmup + args.requests)]
+    for video_id in video_ids[:args.warmup]:
+        fetch(args.url, video_id, args.timeout)
+
+    sampler = RssSampler(args.pid) if args.pid else None
+    if sampler:
+        sampler.start()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        results = list(executor.map(lambda video_id: fetch(args.url, video_id, args.timeout),
+                                    video_ids[args.warmup:]))
+    wall = time.perf_counter() - started
+    if sampler:
+        sampler.stop()
+
+    latencies = sorted(elapsed for status, elapsed, _ in results if status == 200)
+    round_trips = sorted(trips for status, _, trips in results if status == 200 and trips is not None)
+    statuses = {}
+    for status, _, _ in results:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    ms = lambda value: round(value * 1000, 1) if value is not None else None
+    return {
+        'requests': args.requests,
+        'concurrency': args.concurrency,
+        'statuses': statuses,
+        'latency_ms': {
+            'p50': ms(percentile(latencies, 0.5)),
+            'p95': ms(percentile(latencies, 0.95)),
+            'p99': ms(percentile(latencies, 0.99)),
+            'max': ms(latencies[-1] if latencies else None),
+        },
+        'throughput_rps': round(len(latencies) / wall, 3) if wall else None,
+        'wall_s': round(wall, 2),
+        'peak_rss_mb': round(sampler.peak / 2 ** 20, 1) if sampler else None,
+        'webdriver_round_trips': {
+            'mean': round(sum(round_trips) / len(round_trips), 1) if round_trips else None,
+            'p95': percentile(round_trips, 0.95),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark /get_transcript against the NoteGPT stand-in')
+    parser.add_argument('--url', default=None, help='Service to benchmark (default: the spawned one)')
+    parser.add_argument('--pid', type=int, default=None, help='Service PID whose process tree RSS is sampled')
+    parser.add_argument('--spawn', action='store_true', help='Start the stand-in and the service locally')
+    parser.add_argument('--app-port', type=int, default=5055)
+    parser.add_argument('--standin-port', type=int, default=8001)
+    parser.add_argument('--requests', type=int, default=20)
+    parser.add_argument('--concurrency', type=int, default=2)
+    parser.add_argument('--warmup', type=int, default=1, help='Requests sent first and left out of the report')
+    parser.add_argument('--timeout', type=float, default=300)
+    parser.add_argument('--lines', type=int, default=500)
+    parser.add_argument('--virtualized', action='store_true')
+    parser.add_argument('--page-size', type=int, default=0)
+    parser.add_argument('--render-delay-ms', type=int, default=0)
+    parser.add_argument('--api-delay-ms', type=int, default=0)
+    parser.add_argument('--output', help='Also write the JSON report to this file')
+    args = parser.parse_args()
+
+    if not args.spawn and not args.url:
+        parser.error('pass --url of a running service, or --spawn')
+
+    processes = []
+    with tempfile.TemporaryDirectory(prefix='transcript-bench-') as workdir:
+        try:
+            if args.spawn:
+                processes = spawn_servers(args, workdir)
+                args.url = args.url or f'http://127.0.0.1:{args.app_port}'
+                args.pid = args.pid or processes[1].pid
+            logger.info(f'Benchmarking {args.url}: {args.requests} requests at concurrency {args.concurrency}')
+            report = run(args)
+        finally:
+            for process in reversed(processes):
+                process.terminate()
+                try:
+                    process.wait(timeout=30)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    # Fail the run (e.g. in CI) when any request did not succeed
+    return 0 if set(report['statuses']) == {'200'} else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,195 @@
+import logging
+import threading
+
+from selenium import webdriver
+from selenium.webdriver.chromium.remote_connection import ChromiumRemoteConnection
+from selenium.webdriver.remote.webdriver import WebDriver as RemoteWebDriver
+
+logger = logging.getLogger(__name__)
+
+
+# One Chrome process that hosts several isolated browser contexts. The root
+# driver launched it and only issues the Target.* commands that create and
+# dispose contexts; scrapes run on ContextDriver sessions attached to it.
+class SharedBrowser:
+    def __init__(self, launch, counter_lock=None):
+        self.root = launch()
+        self.executor_url = self.root.service.service_url
+        self.debugger_address = self.root.capabilities['goog:chromeOptions']['debuggerAddress']
+        self.pid = self.root.service.process.pid
+        self.contexts = 0
+        self.opened = 0
+        self.retiring = False
+        self.closed = False
+        self._counter_lock = counter_lock or threading.Lock()
+        self._lock = threading.Lock()
+
+    # Function to create a browser context (own cookies, storage and cache) with one blank tab in it
+    def open_context(self, proxy=None):
+        params = {'disposeOnDetach': False}
+        if proxy:
+            params['proxyServer'] = proxy
+        with self._lock:
+            context_id = self.root.execute_cdp_cmd('Target.createBrowserContext', params)['browserContextId']
+            target_id = self.root.execute_cdp_cmd('Target.createTarget', {
+                'url': 'about:blank',
+                'browserContextId': context_id,
+            })['targetId']
+            self.opened += 1
+        return context_id, target_id
+
+    # Function to drop a browser context together with its tabs and everything they stored
+    def dispose_context(self, context_id):
+        with self._lock:
+            self.root.execute_cdp_cmd('Target.disposeBrowserContext', {'browserContextId': context_id})
+
+    # Function to give back a context slot once its ContextDriver has quit; a
+    # retiring Chrome quits as soon as its last context is gone
+    def release_context(self):
+        with self._counter_lock:
+            self.contexts = max(self.contexts - 1, 0)
+            drained = self.retiring and self.contexts == 0
+        if drained:
+            logger.info(f'Retired shared Chrome (chromedriver pid {self.pid}) drained; quitting it')
+            self.quit()
+
+    def is_alive(self):
+        try:
+            self.root.execute_cdp_cmd('Browser.getVersion', {})
+            return True
+        except Exception:
+            return False
+
+    def quit(self):
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self.root.quit()
+        except Exception:
+            logger.exception('Error quitting shared Chrome')
+
+
+# A WebDriver session bound to a single tab inside its own browser context of a
+# SharedBrowser. It is a separate ChromeDriver session attached through the
+# debugger address, so each context has its own command queue and current
+# window, and commands from concurrent scrapes never land on another context's tab.
+class ContextDriver(webdriver.Chrome):
+    def __init__(self, browser, options, proxy=None):
+        self.browser = browser
+        self.proxy = proxy
+        options.debugger_address = browser.debugger_address
+        executor = ChromiumRemoteConnection(
+            browser.executor_url, vendor_prefix='goog', browser_name='chrome', keep_alive=True)
+        # Skip ChromiumDriver.__init__, which would start another chromedriver process
+        self.vendor_prefix = 'goog'
+        self.service = None
+        self.context_id = None
+        RemoteWebDriver.__init__(self, command_executor=executor, options=options)
+        self._is_remote = False
+        try:
+            self._open_context()
+        except Exception:
+            RemoteWebDriver.quit(self)
+            raise
+
+    def _open_context(self):
+        self.context_id, target_id = self.browser.open_context(self.proxy)
+        self.switch_to.window(target_id)
+
+    # Function to swap the browser context for a fresh one, which wipes cookies,
+    # storage and cache far more thoroughly than clearing them page by page.
+    # Per-tab CDP setup is lost with the old tab, so setup() reapplies it.
+    def renew(self, setup=None):
+        old_context_id = self.context_id
+        self._open_context()
+        self.browser.dispose_context(old_context_id)
+        if setup is not None:
+            setup(self)
+
+    def quit(self):
+        if self.context_id is None:
+            return
+        try:
+            self.browser.dispose_context(self.context_id)
+        except Exception:
+            logger.warning('Error disposing browser context')
+        finally:
+            self.context_id = None
+            self.browser.release_context()
+            try:
+                RemoteWebDriver.quit(self)
+            except Exception:
+                pass
+
+
+# Spreads browser contexts over up to `processes` shared Chromes with at most
+# contexts_per_process each, launching Chromes lazily and replacing dead ones.
+# A Chrome for which the optional retire(browser) returns True stops taking new
+# contexts and quits once its last one is gone; its replacement may be launched
+# meanwhile, so for a while there can be one Chrome more than `processes`.
+class BrowserGroup:
+    def __init__(self, launch, processes=1, contexts_per_process=4, retire=None):
+        if processes < 1 or contexts_per_process < 1:
+            raise ValueError("processes and contexts_per_process must be at least 1")
+        self.launch = launch
+        self.processes = processes
+        self.contexts_per_process = contexts_per_process
+        self.retire = retire
+        self._browsers = []
+        self._lock = threading.Lock()
+
+    # Function to open a ContextDriver on the least loaded Chrome
+    def open(self, options, proxy=None):
+        browser = self._reserve()
+        try:
+            return ContextDriver(browser, options, proxy=proxy)
+        except Exception:
+            browser.release_context()
+            raise
+
+    # Function for DriverPool(retire=): retires a context whose Chrome is due for
+    # recycling, so the pool opens its replacement in another Chrome
+    def should_retire(self, driver):
+        browser = driver.browser
+        if not browser.retiring and self.retire is not None and self.retire(browser):
+            with self._lock:
+                browser.retiring = True
+        return browser.retiring
+
+    def stats(self):
+        with self._lock:
+            return [
+                {'pid': browser.pid, 'contexts': browser.contexts, 'opened': browser.opened,
+                 'retiring': browser.retiring}
+                for browser in self._browsers
+            ]
+
+    def close(self):
+        with self._lock:
+            browsers, self._browsers = self._browsers, []
+        for browser in browsers:
+            browser.quit()
+
+    def _reserve(self):
+        with self._lock:
+            for browser in list(self._browsers):
+                if browser.retiring and browser.contexts == 0:
+                    self._browsers.remove(browser)
+                    browser.quit()
+                elif not browser.is_alive():
+                    logger.warning('Shared Chrome stopped answering; replacing it')
+                    self._browsers.remove(browser)
+                    browser.quit()
+            active = [browser for browser in self._browsers if not browser.retiring]
+            candidates = [browser for browser in active if browser.contexts < self.contexts_per_process]
+            if candidates:
+                browser = min(candidates, key=lambda browser: browser.contexts)
+            elif len(active) < self.processes:
+                logger.info('Launching a shared Chrome for browser contexts')
+                browser = SharedBrowser(self.launch, counter_lock=self._lock)
+                self._browsers.append(browser)
+            else:
+                raise RuntimeError("Every shared Chrome is already hosting its maximum number of contexts")
+            browser.contexts += 1
+            return browser
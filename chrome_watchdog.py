@@ -0,0 +1,352 @@
+import collections
+import glob
+import json
+import logging
+import os
+import re
+import shutil
+import signal
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# chromedriver adds this switch to every Chrome it launches, so it tells our
+# browsers apart from any other Chrome on the host
+WEBDRIVER_SWITCH = '--test-type=webdriver'
+CHROME_NAMES = ('chrome', 'google-chrome', 'chromium', 'chromium-browser', 'chrome-headless-shell')
+CHROMEDRIVER_NAME = 'chromedriver'
+
+# Temporary profiles and scratch directories chromedriver and Chrome create and
+# normally delete on quit; a crash leaves them behind
+PROFILE_PATTERNS = ('.com.google.Chrome.*', '.org.chromium.Chromium.*', 'scoped_dir*')
+
+# Everything here reads the process table from /proc, which only Linux has
+PROC_AVAILABLE = os.path.isdir('/proc')
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK')
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+
+
+# Function to read (comm, state, ppid, start ticks) of a process from /proc, or None if it is gone
+def read_stat(pid):
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            data = f.read()
+    except OSError:
+        return None
+    # The command name may contain spaces and parentheses, so split around the last ')'
+    comm = data[data.index('(') + 1:data.rindex(')')]
+    fields = data[data.rindex(')') + 2:].split()
+    return comm, fields[0], int(fields[1]), int(fields[19])
+
+
+def read_cmdline(pid):
+    try:
+        with open(f'/proc/{pid}/cmdline', 'rb') as f:
+            return [arg.decode(errors='replace') for arg in f.read().split(b'\0') if arg]
+    except OSError:
+        return []
+
+
+def read_rss(pid):
+    try:
+        with open(f'/proc/{pid}/statm') as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return 0
+
+
+# Function to get the seconds since a process started, from its start ticks
+def process_age(start_ticks):
+    with open('/proc/uptime') as f:
+        uptime = float(f.read().split()[0])
+    return uptime - start_ticks / CLOCK_TICKS
+
+
+# Function to snapshot every process as pid -> (comm, state, ppid, start ticks); empty without /proc
+def list_processes():
+    processes = {}
+    if not PROC_AVAILABLE:
+        return processes
+    for entry in os.listdir('/proc'):
+        if entry.isdigit():
+            stat = read_stat(int(entry))
+            if stat is not None:
+                processes[int(entry)] = stat
+    return processes
+
+
+# Function to list a process and all of its descendants, parents first
+def process_tree(root_pid, processes=None):
+    if processes is None:
+        processes = list_processes()
+    children = collections.defaultdict(list)
+    for pid, (_, _, ppid, _) in processes.items():
+        children[ppid].append(pid)
+    pids, stack = [], [root_pid]
+    while stack:
+        pid = stack.pop()
+        if pid in processes:
+            pids.append(pid)
+        stack.extend(children.get(pid, []))
+    return pids
+
+
+# Function to sum the resident memory of a process tree, in bytes
+def tree_rss(root_pid, processes=None):
+    return sum(read_rss(pid) for pid in process_tree(root_pid, processes))
+
+
+# Function to check that pid still runs the process that started at start_ticks, not a reused PID
+def is_same_process(pid, start_ticks, processes):
+    stat = processes.get(pid)
+    return stat is not None and stat[1] != 'Z' and stat[3] == start_ticks
+
+
+# Function to SIGTERM a set of processes, then SIGKILL whatever is still there after grace seconds
+def terminate(pids, grace=5):
+    for pid in pids:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except OSError:
+            pass
+    deadline = time.monotonic() + grace
+    while time.monotonic() < deadline:
+        alive = [pid for pid in pids if (read_stat(pid) or (None, 'Z'))[1] != 'Z']
+        if not alive:
+            break
+        time.sleep(0.1)
+    for pid in pids:
+        stat = read_stat(pid)
+        if stat is not None and stat[1] != 'Z':
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except OSError:
+                pass
+    reap_children(pids)
+
+
+# Function to collect the exit status of any of pids that are our own children, so
+# they do not linger as zombies
+def reap_children(pids):
+    for pid in pids:
+        try:
+            os.waitpid(pid, os.WNOHANG)
+        except ChildProcessError:
+            pass
+
+
+# Keeps the Chrome and chromedriver processes of a long-running service in
+# check. Every chromedriver this process launches is tracked, and a pid file
+# records it under pid_dir so another worker can clean up after us if we are
+# killed mid-request. Drivers are recycled after max_uses scrapes or once their
+# process tree passes max_rss bytes. A periodic sweep kills orphaned Chromes and
+# chromedrivers (their owner died, or they were re-parented to init), reaps
+# zombies and deletes temporary profile directories nothing uses any more.
+# Processes and directories younger than grace seconds are left alone so the
+# sweep never races a launch in progress.
+class ChromeWatchdog:
+    def __init__(self, pid_dir, max_uses=100, max_rss=1024 * 2 ** 20, interval=60, grace=60,
+                 temp_dir=None):
+        self.pid_dir = pid_dir
+        self.max_uses = max_uses
+        self.max_rss = max_rss
+        self.interval = interval
+        self.grace = grace
+        self.temp_dir = temp_dir or tempfile.gettempdir()
+        os.makedirs(pid_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._tracked = {}
+        self._recycled = collections.Counter()
+        self._reaped_processes = 0
+        self._removed_dirs = 0
+        self._last_sweep = None
+        self._owner = os.getpid()
+        self._owner_started = read_stat(self._owner)[3]
+
+    # Function to track the chromedriver (and the Chrome below it) behind a freshly launched driver
+    def track(self, driver):
+        pid = driver.service.process.pid
+        stat = read_stat(pid)
+        if stat is None:
+            return
+        entry = {
+            'owner': self._owner,
+            'owner_started': self._owner_started,
+            'pid': pid,
+            'started': stat[3],
+        }
+        with open(self._pid_file(pid), 'w') as f:
+            json.dump(entry, f)
+        with self._lock:
+            self._tracked[pid] = entry
+
+    # Function for DriverPool(retire=): counts a scrape on a driver and tells
+    # whether it is due for recycling
+    def retire_driver(self, driver):
+        driver.uses = getattr(driver, 'uses', 0) + 1
+        return self._over_limits(driver.uses, driver.service.process.pid)
+
+    # Function for BrowserGroup(retire=): a shared Chrome counts every context it opened as a use
+    def retire_browser(self, browser):
+        return self._over_limits(browser.opened, browser.pid)
+
+    def _over_limits(self, uses, pid):
+        reason = None
+        if self.max_uses and uses >= self.max_uses:
+            reason = 'uses'
+            logger.info(f'Recycling Chrome (chromedriver pid {pid}) after {uses} uses')
+        elif self.max_rss:
+            rss = tree_rss(pid)
+            if rss > self.max_rss:
+                reason = 'rss'
+                logger.info(f'Recycling Chrome (chromedriver pid {pid}) at {rss // 2 ** 20}MB RSS')
+        if reason is None:
+            return False
+        with self._lock:
+            self._recycled[reason] += 1
+        return True
+
+    # Function to sum the resident memory of every tracked chromedriver and its Chromes
+    def tracked_rss(self):
+        with self._lock:
+            pids = list(self._tracked)
+        processes = list_processes()
+        return sum(tree_rss(pid, processes) for pid in pids)
+
+    def run_forever(self):
+        while True:
+            try:
+                self.sweep()
+            except Exception:
+                logger.exception('Error sweeping Chrome processes')
+            time.sleep(self.interval)
+
+    # Function to clean up after crashed drivers and dead workers; returns what it did
+    def sweep(self):
+        processes = list_processes()
+        orphans = self._orphans_from_pid_files(processes) | self._stray_processes(processes)
+        killed = set()
+        for pid in orphans:
+            killed.update(process_tree(pid, processes))
+        if killed:
+            logger.warning(f'Killing {len(killed)} orphaned Chrome/chromedriver processes: {sorted(killed)}')
+            terminate(sorted(killed))
+        self._reap_zombies(processes)
+        removed = self._remove_stale_profiles()
+        with self._lock:
+            self._reaped_processes += len(killed)
+            self._removed_dirs += removed
+            self._last_sweep = time.time()
+        return {'killed': len(killed), 'removed_dirs': removed}
+
+    def stats(self):
+        with self._lock:
+            tracked = len(self._tracked)
+            stats = {
+                'tracked_chromedrivers': tracked,
+                'max_uses': self.max_uses,
+                'max_rss_mb': self.max_rss // 2 ** 20 if self.max_rss else None,
+                'recycled': dict(self._recycled),
+                'reaped_processes': self._reaped_processes,
+                'removed_profile_dirs': self._removed_dirs,
+                'last_sweep': self._last_sweep,
+            }
+        stats['tracked_rss_mb'] = round(self.tracked_rss() / 2 ** 20, 1)
+        return stats
+
+    def _pid_file(self, pid):
+        return os.path.join(self.pid_dir, f'{self._owner}-{pid}.json')
+
+    # Function to go through the pid files: forget chromedrivers that exited, and
+    # return the ones whose owning worker is gone
+    def _orphans_from_pid_files(self, processes):
+        orphans = set()
+        for path in glob.glob(os.path.join(self.pid_dir, '*.json')):
+            try:
+                with open(path) as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):
+                continue
+            pid = entry['pid']
+            if not is_same_process(pid, entry['started'], processes):
+                self._forget(path, entry)
+            elif not is_same_process(entry['owner'], entry['owner_started'], processes):
+                orphans.add(pid)
+                self._forget(path, entry)
+        return orphans
+
+    def _forget(self, path, entry):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        if entry['owner'] == self._owner:
+            with self._lock:
+                self._tracked.pop(entry['pid'], None)
+
+    # Function to find chromedrivers re-parented to init and webdriver Chromes whose
+    # chromedriver is gone, even if no pid file was written (e.g. a launch that failed halfway)
+    def _stray_processes(self, processes):
+        strays = set()
+        for pid, (comm, state, ppid, started) in processes.items():
+            if state == 'Z' or process_age(started) < self.grace:
+                continue
+            if comm == CHROMEDRIVER_NAME:
+                # When we run as init ourselves, chromedrivers are meant to be our children
+                if ppid == 1 and self._owner != 1:
+                    strays.add(pid)
+                continue
+            cmdline = read_cmdline(pid)
+            if not cmdline or os.path.basename(cmdline[0]) not in CHROME_NAMES:
+                continue
+            parent_comm = processes.get(ppid, ('',))[0]
+            is_browser = WEBDRIVER_SWITCH in cmdline and not any(arg.startswith('--type=') for arg in cmdline)
+            if is_browser and parent_comm != CHROMEDRIVER_NAME:
+                strays.add(pid)
+            elif not is_browser and ppid == 1 and self._owner != 1:
+                strays.add(pid)
+        return strays
+
+    # Function to collect exited chromedrivers and Chromes that are our children
+    def _reap_zombies(self, processes):
+        zombies = [
+            pid for pid, (comm, state, ppid, _) in processes.items()
+            if state == 'Z' and ppid == self._owner and (comm == CHROMEDRIVER_NAME or comm in CHROME_NAMES)
+        ]
+        reap_children(zombies)
+
+    # Function to delete temporary profile directories no live process refers to
+    def _remove_stale_profiles(self):
+        candidates = []
+        for pattern in PROFILE_PATTERNS:
+            candidates.extend(glob.glob(os.path.join(self.temp_dir, pattern)))
+        if not candidates:
+            return 0
+
+        in_use = set()
+        for pid in list_processes():
+            for arg in read_cmdline(pid):
+                if arg.startswith('--user-data-dir='):
+                    in_use.add(os.path.realpath(arg.split('=', 1)[1]))
+        removed = 0
+        now = time.time()
+        for path in candidates:
+            try:
+                if not os.path.isdir(path) or now - os.path.getmtime(path) < self.grace:
+                    continue
+            except OSError:
+                continue
+            if os.path.realpath(path) in in_use:
+                continue
+            # chromedriver names its scratch directories after its own pid
+            match = re.match(r'scoped_dir(\d+)_', os.path.basename(path))
+            if match and read_stat(int(match.group(1))) is not None:
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            removed += 1
+        if removed:
+            logger.info(f'Removed {removed} stale Chrome profile directories from {self.temp_dir}')
+        return removed
@@ -0,0 +1,151 @@
+import collections
+import logging
+import math
+import threading
+import time
+
+from admission import Saturated
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+# Raised instead of driving a browser while the circuit is open; handled like any
+# other saturation, so clients get a 503 with Retry-After
+class CircuitOpen(Saturated):
+    def __init__(self, message, retry_after):
+        super().__init__(message, 503, retry_after)
+
+
+# Circuit breaker around the upstream page flow. failure_threshold consecutive
+# upstream failures (any step, any kind) open the circuit, and scrapes fail fast
+# for the cool-down. After that up to half_open_probes scrapes are let through as
+# probes: a successful probe closes the circuit, a failed one opens it again with
+# a doubled cool-down. Failures are also counted per step and kind so the
+# breaking change (e.g. a renamed selector) can be read from stats().
+# Failures that may as well be down to the request (a transcript that never
+# shows up is usually a private video) have a threshold of their own: they
+# only open the circuit once suspect_threshold distinct videos in a row hit one.
+class CircuitBreaker:
+    def __init__(self, failure_threshold=5, cooldown=30, cooldown_max=300, half_open_probes=1, enabled=True,
+                 suspect_threshold=10):
+        self.failure_threshold = failure_threshold
+        self.suspect_threshold = suspect_threshold
+        self.cooldown = cooldown
+        self.cooldown_max = cooldown_max
+        self.half_open_probes = half_open_probes
+        self.enabled = enabled
+
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._consecutive_failures = 0
+        self._suspect_keys = set()
+        self._current_cooldown = cooldown
+        self._opened_until = 0.0
+        self._probes_in_flight = 0
+        self._opens = 0
+        self._rejected = 0
+        self._failures = collections.Counter()
+        self._last_failure = None
+
+    # Function to let a scrape through or raise CircuitOpen; returns True when the
+    # scrape is a half-open probe, which the caller must hand back with end_probe()
+    def acquire(self):
+        if not self.enabled:
+            return False
+        with self._lock:
+            now = time.monotonic()
+            if self._state == OPEN and now >= self._opened_until:
+                self._state = HALF_OPEN
+                logger.info('Circuit half-open; letting probe scrapes through')
+            if self._state == CLOSED:
+                return False
+            if self._state == HALF_OPEN and self._probes_in_flight < self.half_open_probes:
+                self._probes_in_flight += 1
+                return True
+            self._rejected += 1
+            retry_after = max(1, math.ceil(self._opened_until - now)) if self._state == OPEN else 1
+            raise CircuitOpen("The transcript service upstream is failing; please retry later", retry_after)
+
+    def end_probe(self):
+        with self._lock:
+            self._probes_in_flight = max(self._probes_in_flight - 1, 0)
+
+    def record_success(self):
+        with self._lock:
+            self._consecutive_failures = 0
+            self._suspect_keys.clear()
+            if self._state != CLOSED:
+                logger.info('Probe scrape succeeded; closing the circuit')
+                self._state = CLOSED
+                self._current_cooldown = self.cooldown
+
+    # Function to record an upstream failure at a step; kind is e.g. 'selector_missing',
+    # 'timeout' or 'navigation'
+    def record_failure(self, step, kind, message=None):
+        with self._lock:
+            self._failures[(step, kind)] += 1
+            self._last_failure = {'step': step, 'kind': kind, 'message': message, 'at': time.time()}
+            self._consecutive_failures += 1
+            if self._state == HALF_OPEN:
+                self._current_cooldown = min(self._current_cooldown * 2, self.cooldown_max)
+                self._open()
+            elif self._state == CLOSED and self._consecutive_failures >= self.failure_threshold:
+                self._open()
+
+    # Function to record a failure that may be down to the request rather than the upstream,
+    # keyed by what was requested (the video ID) so retries of one video count once
+    def record_suspect_failure(self, step, kind, key, message=None):
+        with self._lock:
+            self._failures[(step, kind)] += 1
+            self._last_failure = {'step': step, 'kind': kind, 'message': message, 'at': time.time()}
+            self._suspect_keys.add(key)
+            if len(self._suspect_keys) < self.suspect_threshold or self._state == OPEN:
+                return
+            if self._state == HALF_OPEN:
+                self._current_cooldown = min(self._current_cooldown * 2, self.cooldown_max)
+            self._open()
+
+    def reset(self):
+        with self._lock:
+            self._state = CLOSED
+            self._consecutive_failures = 0
+            self._suspect_keys.clear()
+            self._current_cooldown = self.cooldown
+            self._opened_until = 0.0
+
+    def stats(self):
+        with self._lock:
+            now = time.monotonic()
+            return {
+                'enabled': self.enabled,
+                'state': self._state,
+                'consecutive_failures': self._consecutive_failures,
+                'failure_threshold': self.failure_threshold,
+                'consecutive_suspect_failures': len(self._suspect_keys),
+                'suspect_threshold': self.suspect_threshold,
+                'retry_after': round(max(self._opened_until - now, 0), 1) if self._state == OPEN else 0,
+                'cooldown_s': self._current_cooldown,
+                'opens': self._opens,
+                'rejected': self._rejected,
+                'probes_in_flight': self._probes_in_flight,
+                'failures': [
+                    {'step': step, 'kind': kind, 'count': count}
+                    for (step, kind), count in self._failures.most_common()
+                ],
+                'last_failure': self._last_failure,
+            }
+
+    def _open(self):
+        self._state = OPEN
+        self._opens += 1
+        self._opened_until = time.monotonic() + self._current_cooldown
+        failure = self._last_failure
+        logger.error(f"Opening the circuit for {self._current_cooldown}s after "
+                     f"{self._consecutive_failures} consecutive failures and "
+                     f"{len(self._suspect_keys)} suspect ones "
+                     f"(last: {failure['kind']} during {failure['step']})")
+        self._suspect_keys.clear()
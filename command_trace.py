@@ -0,0 +1,138 @@
+import collections
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+
+# Trace of the request being handled, if it asked for one; hedged attempts and
+# background scrapes inherit it through copied contexts
+current_trace = contextvars.ContextVar('current_trace', default=None)
+
+
+# Function to pick the parameter that identifies a WebDriver command in a trace
+def describe_command(driver_command, params):
+    if not params:
+        return None
+    if 'script' in params:
+        return ' '.join(params['script'].split())[:80]
+    if 'cmd' in params:
+        return params['cmd']
+    if 'url' in params:
+        return params['url']
+    if 'value' in params and 'using' in params:
+        return f"{params['using']}={params['value']}"
+    return None
+
+
+# Records every WebDriver command issued for one request, with its duration,
+# next to the phase spans of the page flow. Exports the Chrome trace event
+# format (load it in chrome://tracing or Perfetto) and a compact summary.
+class CommandTrace:
+    def __init__(self, label):
+        self.trace_id = uuid.uuid4().hex[:12]
+        self.label = label
+        self.origin = time.perf_counter()
+        self.path = None
+        self._lock = threading.Lock()
+        self._events = []
+
+    def add_command(self, driver_command, params, started, ended):
+        self._add({'name': driver_command, 'cat': 'webdriver', 'started': started, 'ended': ended,
+                   'detail': describe_command(driver_command, params)})
+
+    # Function to add the phase spans recorded by a PhaseTimer
+    def add_phases(self, timer):
+        for name, started, ended in timer.spans:
+            self._add({'name': name, 'cat': 'phase', 'started': started, 'ended': ended, 'detail': None})
+
+    def _add(self, event):
+        event['tid'] = threading.get_ident()
+        with self._lock:
+            self._events.append(event)
+
+    def chrome_trace(self):
+        pid = os.getpid()
+        with self._lock:
+            events = list(self._events)
+        trace_events = []
+        for event in events:
+            trace_event = {
+                'name': event['name'],
+                'cat': event['cat'],
+                'ph': 'X',
+                'ts': round((event['started'] - self.origin) * 1e6, 1),
+                'dur': round((event['ended'] - event['started']) * 1e6, 1),
+                'pid': pid,
+                'tid': event['tid'],
+            }
+            if event['detail']:
+                trace_event['args'] = {'detail': event['detail']}
+            trace_events.append(trace_event)
+        return {'traceEvents': trace_events, 'otherData': {'trace_id': self.trace_id, 'label': self.label}}
+
+    def summary(self, slowest=5):
+        with self._lock:
+            events = list(self._events)
+        commands = [event for event in events if event['cat'] == 'webdriver']
+        by_command = collections.OrderedDict()
+        for event in commands:
+            elapsed = (event['ended'] - event['started']) * 1000
+            stats = by_command.setdefault(event['name'], {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+            stats['count'] += 1
+            stats['total_ms'] += elapsed
+            stats['max_ms'] = max(stats['max_ms'], elapsed)
+        for stats in by_command.values():
+            stats['total_ms'] = round(stats['total_ms'], 1)
+            stats['max_ms'] = round(stats['max_ms'], 1)
+        slowest_commands = sorted(commands, key=lambda event: event['started'] - event['ended'])[:slowest]
+        return {
+            'trace_id': self.trace_id,
+            'file': self.path,
+            'round_trips': len(commands),
+            'command_ms': round(sum((event['ended'] - event['started']) * 1000 for event in commands), 1),
+            'by_command': by_command,
+            'phases': {
+                event['name']: round((event['ended'] - event['started']) * 1000, 1)
+                for event in events if event['cat'] == 'phase'
+            },
+            'slowest': [
+                {'command': event['name'], 'detail': event['detail'],
+                 'ms': round((event['ended'] - event['started']) * 1000, 1)}
+                for event in slowest_commands
+            ],
+        }
+
+    # Function to write the Chrome trace to trace_dir and return its path
+    def save(self, trace_dir):
+        os.makedirs(trace_dir, exist_ok=True)
+        path = os.path.join(trace_dir, f'{self.label}-{self.trace_id}.json')
+        with open(path, 'w') as f:
+            json.dump(self.chrome_trace(), f)
+        self.path = path
+        return path
+
+
+# Function to record every command a driver sends until the returned function is
+# called. Commands from WebElements go through their parent driver's execute as
+# well, so they are covered. The driver must be checked out exclusively meanwhile.
+def trace_driver(driver, trace):
+    previous = driver.__dict__.get('execute')
+    original = driver.execute
+
+    def execute(driver_command, params=None):
+        started = time.perf_counter()
+        try:
+            return original(driver_command, params)
+        finally:
+            trace.add_command(driver_command, params, started, time.perf_counter())
+
+    def untrace():
+        if previous is None:
+            del driver.execute
+        else:
+            driver.execute = previous
+
+    driver.execute = execute
+    return untrace
@@ -0,0 +1,83 @@
+import gzip
+import hashlib
+
+try:
+    import brotli
+except ImportError:  # Optional; without it responses are only gzipped
+    brotli = None
+
+# Encodings we can produce, preferred first when the client rates them the same
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+# Function to parse an Accept-Encoding header into {coding: quality}
+def parse_accept_encoding(header):
+    qualities = {}
+    for part in (header or '').split(','):
+        coding, _, params = part.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding] = quality
+    return qualities
+
+
+# Function to pick the encoding the client rates highest among those we can produce,
+# or 'identity' when it accepts none of them
+def negotiate_encoding(header, encodings=ENCODINGS):
+    qualities = parse_accept_encoding(header)
+    best, best_quality = 'identity', 0.0
+    for encoding in encodings:
+        quality = qualities.get(encoding, qualities.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+# Function to compress a response body; gzip without a timestamp so the output only depends on the input
+def compress(body, encoding, gzip_level=9, brotli_quality=11):
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=gzip_level, mtime=0)
+    if encoding == 'br' and brotli is not None:
+        return brotli.compress(body, quality=brotli_quality)
+    raise ValueError(f"Unsupported content encoding: {encoding}")
+
+
+# Function to derive a strong ETag from content
+def strong_etag(content):
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    return '"' + hashlib.sha256(content).hexdigest()[:32] + '"'
+
+
+# Function to get the ETag of one encoding of the content; each encoding is a different
+# sequence of bytes, so it gets a tag of its own
+def representation_etag(etag, encoding):
+    if encoding == 'identity':
+        return etag
+    return f'{etag[:-1]}-{encoding}"'
+
+
+# Function to tell whether an If-None-Match header matches the content, in any of its encodings.
+# Uses the weak comparison RFC 9110 asks for, so a W/ prefix added by a proxy still matches.
+def etag_matches(header, etag):
+    if not header:
+        return False
+    tags = {representation_etag(etag, encoding) for encoding in ('identity', 'gzip', 'br')}
+    for tag in header.split(','):
+        tag = tag.strip()
+        if tag == '*':
+            return True
+        if tag.startswith('W/'):
+            tag = tag[2:]
+        if tag in tags:
+            return True
+    return False
@@ -0,0 +1,192 @@
+import collections
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+# Raised when no driver could be checked out before the timeout expired
+class DriverPoolTimeout(Exception):
+    pass
+
+
+# Raised when a driver is requested from a pool that has been shut down
+class DriverPoolClosed(Exception):
+    pass
+
+
+# Function to clear cookies, storage and extra tabs so the next request starts clean
+def reset_driver(driver):
+    handles = driver.window_handles
+    for handle in handles[1:]:
+        driver.switch_to.window(handle)
+        driver.close()
+    driver.switch_to.window(handles[0])
+
+    driver.execute_cdp_cmd('Network.clearBrowserCookies', {})
+    origin = driver.execute_script("return window.location.origin")
+    if origin and origin != 'null':
+        driver.execute_cdp_cmd('Storage.clearDataForOrigin', {
+            'origin': origin,
+            'storageTypes': 'local_storage,session_storage,indexeddb,websql,service_workers,cache_storage',
+        })
+    driver.get('about:blank')
+
+
+# Function to check that the browser behind a driver still answers commands
+def is_driver_healthy(driver):
+    try:
+        driver.execute_script("return 1")
+        return True
+    except Exception:
+        return False
+
+
+# Bounded pool of pre-launched Chrome WebDrivers shared by the request handlers.
+# Drivers are created by driver_factory, cleaned by reset on release and evicted
+# as soon as a reset or health check fails, so one crashed browser never gets reused.
+# The optional retire(driver) is asked on every release and evicts the driver when it
+# returns True, e.g. to recycle browsers that have grown too large.
+class DriverPool:
+    def __init__(self, driver_factory, min_size=1, max_size=2, checkout_timeout=60,
+                 health_check_interval=30, reset=reset_driver, retire=None):
+        if min_size > max_size:
+            raise ValueError("min_size cannot be larger than max_size")
+        self.driver_factory = driver_factory
+        self.reset = reset
+        self.retire = retire
+        self.min_size = min_size
+        self.max_size = max_size
+        self.checkout_timeout = checkout_timeout
+        self.health_check_interval = health_check_interval
+
+        self._idle = collections.deque()
+        self._last_used = {}
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    # Launch drivers until min_size of them are idle and ready
+    def warm_up(self):
+        while True:
+            with self._cond:
+                if self._closed or self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                driver = self._create()
+            except Exception:
+                logger.exception('Error warming up the WebDriver pool')
+                return
+            self._put_idle(driver)
+
+    def acquire(self, timeout=None):
+        if timeout is None:
+            timeout = self.checkout_timeout
+        deadline = time.monotonic() + timeout
+
+        while True:
+            create = False
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise DriverPoolClosed("WebDriver pool is closed")
+                    if self._idle:
+                        driver = self._idle.pop()
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        create = True
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise DriverPoolTimeout(f"No WebDriver available after {timeout}s")
+                    self._cond.wait(remaining)
+
+            if create:
+                return self._create()
+
+            idle_for = time.monotonic() - self._last_used.get(id(driver), 0)
+            if idle_for < self.health_check_interval or is_driver_healthy(driver):
+                return driver
+            logger.warning('Evicting unhealthy idle WebDriver')
+            self._discard(driver)
+
+    def release(self, driver, broken=False):
+        if not broken and self.retire is not None:
+            try:
+                broken = self.retire(driver)
+            except Exception:
+                logger.exception('Error checking whether to retire WebDriver')
+
+        if not broken:
+            try:
+                self.reset(driver)
+            except Exception:
+                logger.exception('Error resetting WebDriver; evicting it from the pool')
+                broken = True
+
+        if broken:
+            self._discard(driver)
+            self._replenish()
+        else:
+            self._put_idle(driver)
+
+    def stats(self):
+        with self._cond:
+            return {
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle),
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+            }
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            drivers = list(self._idle)
+            self._idle.clear()
+            self._cond.notify_all()
+        for driver in drivers:
+            self._discard(driver)
+
+    def _create(self):
+        try:
+            logger.info('Launching a new Chrome WebDriver for the pool')
+            return self.driver_factory()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+    def _put_idle(self, driver):
+        with self._cond:
+            if self._closed:
+                closed = True
+            else:
+                closed = False
+                self._last_used[id(driver)] = time.monotonic()
+                self._idle.append(driver)
+                self._cond.notify()
+        if closed:
+            self._discard(driver)
+
+    def _discard(self, driver):
+        with self._cond:
+            self._size -= 1
+            self._last_used.pop(id(driver), None)
+            self._cond.notify()
+        try:
+            driver.quit()
+        except Exception:
+            logger.exception('Error quitting evicted WebDriver')
+
+    # Top the pool back up to min_size in the background after an eviction
+    def _replenish(self):
+        with self._cond:
+            if self._closed or self._size >= self.min_size:
+                return
+        threading.Thread(target=self.warm_up, daemon=True).start()
@@ -0,0 +1,177 @@
+import collections
+import logging
+import os
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Key used for sessions that go out without a proxy
+DIRECT = 'direct'
+
+# The proxy and User-Agent a browser session goes out with
+Identity = collections.namedtuple('Identity', ['proxy', 'user_agent'])
+
+
+# Function to load the non-empty lines of a text file
+def load_lines(file_path):
+    try:
+        with open(file_path, 'r') as f:
+            return [line.strip() for line in f if line.strip()]
+    except FileNotFoundError:
+        logger.error(f"File not found: {file_path}")
+        return []
+
+
+# Health of one proxy: success rate and latency tracked as EWMAs, plus a
+# quarantine with exponential backoff after consecutive failures
+class ProxyStats:
+    def __init__(self, proxy):
+        self.proxy = proxy
+        self.success_rate = 1.0
+        self.latency = None
+        self.sessions = 0
+        self.requests = 0
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.quarantines = 0
+        self.quarantined_until = 0.0
+
+    def as_dict(self, now):
+        return {
+            'proxy': self.proxy,
+            'success_rate': round(self.success_rate, 3),
+            'latency_ms': round(self.latency * 1000, 1) if self.latency is not None else None,
+            'sessions': self.sessions,
+            'requests': self.requests,
+            'successes': self.successes,
+            'failures': self.failures,
+            'consecutive_failures': self.consecutive_failures,
+            'quarantines': self.quarantines,
+            'quarantined_for': round(max(self.quarantined_until - now, 0), 1),
+        }
+
+
+# Hands out (proxy, User-Agent) pairs for new browser sessions. Both files are
+# read once and reloaded when they change on disk. Proxies are picked at random
+# weighted by success rate over latency, so fast healthy exits are used more,
+# and a proxy that keeps failing is quarantined with exponential backoff.
+class IdentityManager:
+    def __init__(self, user_agents_file, proxies_file=None, use_proxies=False, alpha=0.2,
+                 failure_threshold=3, quarantine_base=30, quarantine_max=1800, reload_interval=5,
+                 default_latency=10.0):
+        self.user_agents_file = user_agents_file
+        self.proxies_file = proxies_file
+        self.use_proxies = use_proxies and bool(proxies_file)
+        self.alpha = alpha
+        self.failure_threshold = failure_threshold
+        self.quarantine_base = quarantine_base
+        self.quarantine_max = quarantine_max
+        self.reload_interval = reload_interval
+        self.default_latency = default_latency
+
+        self._lock = threading.Lock()
+        self._user_agents = []
+        self._stats = {}
+        self._mtimes = {}
+        self._last_reload_check = 0.0
+        self._reload(force=True)
+
+    def acquire(self):
+        self._reload()
+        with self._lock:
+            if not self._user_agents:
+                raise ValueError("User agents file is empty or not found")
+            user_agent = random.choice(self._user_agents)
+            proxy = self._choose_proxy() if self.use_proxies else DIRECT
+            self._stats.setdefault(proxy, ProxyStats(proxy)).sessions += 1
+        return Identity(proxy=proxy, user_agent=user_agent)
+
+    # Function to record the outcome of one scrape; a pooled session serves many of them
+    def report(self, identity, success, latency=None):
+        with self._lock:
+            stats = self._stats.get(identity.proxy)
+            if stats is None:
+                return
+            stats.requests += 1
+            stats.success_rate += self.alpha * ((1.0 if success else 0.0) - stats.success_rate)
+            if success:
+                stats.successes += 1
+                stats.consecutive_failures = 0
+                if latency is not None:
+                    stats.latency = latency if stats.latency is None \
+                        else stats.latency + self.alpha * (latency - stats.latency)
+                return
+
+            stats.failures += 1
+            stats.consecutive_failures += 1
+            if identity.proxy != DIRECT and stats.consecutive_failures >= self.failure_threshold:
+                backoff = min(self.quarantine_base * 2 ** stats.quarantines, self.quarantine_max)
+                stats.quarantines += 1
+                stats.quarantined_until = time.monotonic() + backoff
+                stats.consecutive_failures = 0
+                logger.warning(f'Quarantining proxy {identity.proxy} for {backoff}s')
+
+    def is_quarantined(self, identity):
+        with self._lock:
+            stats = self._stats.get(identity.proxy)
+            return stats is not None and stats.quarantined_until > time.monotonic()
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            proxies = [stats.as_dict(now) for stats in self._stats.values()]
+            user_agents = len(self._user_agents)
+        proxies.sort(key=lambda item: (item['quarantined_for'] > 0, -item['success_rate'],
+                                       item['latency_ms'] if item['latency_ms'] is not None else 0))
+        return {'use_proxies': self.use_proxies, 'user_agents': user_agents, 'proxies': proxies}
+
+    def _choose_proxy(self):
+        now = time.monotonic()
+        candidates = [stats for key, stats in self._stats.items() if key != DIRECT]
+        if not candidates:
+            return DIRECT
+        healthy = [stats for stats in candidates if stats.quarantined_until <= now]
+        if not healthy:
+            soonest = min(candidates, key=lambda stats: stats.quarantined_until)
+            logger.warning(f'All proxies are quarantined; using {soonest.proxy}, which is released soonest')
+            return soonest.proxy
+
+        # Untried proxies are scored with the typical latency so they still get explored
+        measured = sorted(stats.latency for stats in healthy if stats.latency is not None)
+        typical_latency = measured[len(measured) // 2] if measured else self.default_latency
+        weights = [
+            max(stats.success_rate, 0.05) / max(stats.latency if stats.latency is not None else typical_latency, 0.1)
+            for stats in healthy
+        ]
+        return random.choices(healthy, weights=weights)[0].proxy
+
+    def _reload(self, force=False):
+        now = time.monotonic()
+        if not force and now - self._last_reload_check < self.reload_interval:
+            return
+        self._last_reload_check = now
+
+        if self._changed(self.user_agents_file):
+            user_agents = load_lines(self.user_agents_file)
+            with self._lock:
+                self._user_agents = user_agents
+            logger.info(f'Loaded {len(user_agents)} user agents from {self.user_agents_file}')
+
+        if self.use_proxies and self._changed(self.proxies_file):
+            proxies = load_lines(self.proxies_file)
+            with self._lock:
+                # Keep the history of proxies that are still listed
+                self._stats = {proxy: self._stats.get(proxy) or ProxyStats(proxy) for proxy in proxies}
+            logger.info(f'Loaded {len(proxies)} proxies from {self.proxies_file}')
+
+    def _changed(self, file_path):
+        try:
+            mtime = os.stat(file_path).st_mtime
+        except FileNotFoundError:
+            mtime = None
+        changed = self._mtimes.get(file_path, -1) != mtime
+        self._mtimes[file_path] = mtime
+        return changed
@@ -0,0 +1,99 @@
+import csv
+import json
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # Optional; only needed for Parquet exports
+    pyarrow = None
+
+from naukri import JOB_CARD_FIELDS, JOB_DETAIL_ORDER
+
+# Flat columns of a job for CSV and Parquet, detail fields prefixed with "Job Details."
+COLUMNS = list(JOB_CARD_FIELDS) + [f"Job Details.{name}" for name in JOB_DETAIL_ORDER]
+
+FORMATS = ('ndjson', 'csv', 'parquet')
+
+
+# Raised when an export format is unknown or its optional dependency is missing
+class ExportUnavailable(Exception):
+    pass
+
+
+# Function to flatten a scraped job into one row of COLUMNS; lists are joined with ", "
+def flatten_job(job):
+    details = job.get("Job Details", {})
+    row = {}
+    for column in COLUMNS:
+        if column.startswith("Job Details."):
+            value = details
+            for part in column[len("Job Details."):].split('.'):
+                value = value.get(part, "") if isinstance(value, dict) else ""
+        else:
+            value = job.get(column, "")
+        row[column] = ', '.join(value) if isinstance(value, list) else value
+    return row
+
+
+# Writes one JSON object per line, as nested as the job itself
+class NdjsonWriter:
+    def __init__(self, path):
+        self._file = open(path, 'w', encoding='utf-8')
+
+    def write(self, job):
+        self._file.write(json.dumps(job, ensure_ascii=False) + '\n')
+
+    def close(self):
+        self._file.close()
+
+
+class CsvWriter:
+    def __init__(self, path):
+        self._file = open(path, 'w', newline='', encoding='utf-8')
+        self._writer = csv.DictWriter(self._file, fieldnames=COLUMNS)
+        self._writer.writeheader()
+
+    def write(self, job):
+        self._writer.writerow(flatten_job(job))
+
+    def close(self):
+        self._file.close()
+
+
+# Buffers up to batch_size rows and writes each batch as a Parquet row group, so
+# memory stays bounded however many jobs are exported
+class ParquetWriter:
+    def __init__(self, path, batch_size=500):
+        if pyarrow is None:
+            raise ExportUnavailable("Parquet export needs pyarrow (pip install pyarrow)")
+        self.batch_size = batch_size
+        self._schema = pyarrow.schema([(column, pyarrow.string()) for column in COLUMNS])
+        self._writer = pyarrow.parquet.ParquetWriter(path, self._schema)
+        self._rows = []
+
+    def write(self, job):
+        self._rows.append(flatten_job(job))
+        if len(self._rows) >= self.batch_size:
+            self._flush()
+
+    def close(self):
+        self._flush()
+        self._writer.close()
+
+    def _flush(self):
+        if not self._rows:
+            return
+        columns = {column: [str(row[column]) for row in self._rows] for column in COLUMNS}
+        self._writer.write_table(pyarrow.table(columns, schema=self._schema))
+        self._rows = []
+
+
+# Function to open a writer for an export format
+def open_writer(path, export_format):
+    if export_format == 'ndjson':
+        return NdjsonWriter(path)
+    if export_format == 'csv':
+        return CsvWriter(path)
+    if export_format == 'parquet':
+        return ParquetWriter(path)
+    raise ExportUnavailable(f"Unknown export format: {export_format}")
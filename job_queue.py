@@ -0,0 +1,312 @@
+import abc
+import logging
+import os
+import random
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+DEAD = 'dead'
+ACTIVE_STATUSES = (QUEUED, RUNNING)
+FINISHED_STATUSES = (SUCCEEDED, FAILED, DEAD)
+
+
+# Interface for a durable queue of transcript jobs. A worker claims a job under
+# a lease, keeps it alive with heartbeats and then completes or fails it; a job
+# whose lease runs out (e.g. its worker died) is handed to the next claimer.
+# Failed attempts are retried with exponential backoff and jobs that run out of
+# attempts are dead-lettered. Shared backends (e.g. Postgres or Redis) implement
+# the same methods so workers on other hosts can pull from one queue.
+class JobQueue(abc.ABC):
+    @abc.abstractmethod
+    def enqueue(self, video_id, result=None):
+        pass
+
+    @abc.abstractmethod
+    def get(self, job_id):
+        pass
+
+    @abc.abstractmethod
+    def claim(self, worker_id, lease_seconds):
+        pass
+
+    @abc.abstractmethod
+    def heartbeat(self, job_id, worker_id, lease_seconds):
+        pass
+
+    @abc.abstractmethod
+    def complete(self, job_id, worker_id, result):
+        pass
+
+    @abc.abstractmethod
+    def fail(self, job_id, worker_id, error, retryable=True):
+        pass
+
+    @abc.abstractmethod
+    def prune(self, older_than):
+        pass
+
+    @abc.abstractmethod
+    def stats(self):
+        pass
+
+
+# SQLite-backed JobQueue. Claims run in an IMMEDIATE transaction, so any number
+# of worker processes can share the file; across hosts it needs a filesystem
+# with working locks, otherwise use a shared backend. Finished jobs are pruned
+# once they are older than retention seconds (None keeps them forever).
+class SQLiteJobQueue(JobQueue):
+    def __init__(self, path, max_attempts=5, retry_base=5, retry_max=600, retention=None, prune_interval=3600):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.retention = retention
+        self.prune_interval = prune_interval
+        self._local = threading.local()
+        self._last_prune = 0.0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        db = self._db()
+        db.execute('PRAGMA journal_mode=WAL')
+        db.execute(
+            'CREATE TABLE IF NOT EXISTS jobs ('
+            ' id TEXT PRIMARY KEY,'
+            ' video_id TEXT NOT NULL,'
+            ' status TEXT NOT NULL,'
+            ' attempts INTEGER NOT NULL DEFAULT 0,'
+            ' max_attempts INTEGER NOT NULL,'
+            ' available_at REAL NOT NULL,'
+            ' lease_owner TEXT,'
+            ' lease_expires_at REAL,'
+            ' result TEXT,'
+            ' error TEXT,'
+            ' created_at REAL NOT NULL,'
+            ' updated_at REAL NOT NULL)'
+        )
+        db.execute('CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (status, available_at)')
+        db.execute('CREATE INDEX IF NOT EXISTS jobs_video ON jobs (video_id, status)')
+        db.execute('CREATE INDEX IF NOT EXISTS jobs_finished ON jobs (status, updated_at)')
+
+    # Queue a job for a video, or return the job already queued or running for it.
+    # A job enqueued with a result (e.g. from the cache) is recorded as already done,
+    # reusing the finished job that already holds the same result if there is one.
+    def enqueue(self, video_id, result=None):
+        self._prune_if_due()
+        now = time.time()
+        db = self._db()
+        with db:
+            db.execute('BEGIN IMMEDIATE')
+            if result is None:
+                row = db.execute(
+                    'SELECT * FROM jobs WHERE video_id = ? AND status IN (?, ?) ORDER BY created_at LIMIT 1',
+                    (video_id,) + ACTIVE_STATUSES
+                ).fetchone()
+            else:
+                row = db.execute(
+                    'SELECT * FROM jobs WHERE video_id = ? AND status = ? AND result = ?'
+                    ' ORDER BY updated_at DESC LIMIT 1',
+                    (video_id, SUCCEEDED, result)
+                ).fetchone()
+            if row is not None:
+                return dict(row)
+            job_id = uuid.uuid4().hex
+            db.execute(
+                'INSERT INTO jobs (id, video_id, status, max_attempts, available_at, result, created_at, updated_at)'
+                ' VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (job_id, video_id, SUCCEEDED if result is not None else QUEUED, self.max_attempts, now,
+                 result, now, now)
+            )
+        return self.get(job_id)
+
+    def get(self, job_id):
+        row = self._db().execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return dict(row) if row is not None else None
+
+    # Claim the next due job. A running job whose lease expired is claimed again,
+    # unless that was its last attempt: a job that keeps killing its worker is
+    # dead-lettered instead of being retried forever.
+    def claim(self, worker_id, lease_seconds):
+        now = time.time()
+        db = self._db()
+        dead = []
+        job_id = None
+        with db:
+            db.execute('BEGIN IMMEDIATE')
+            while job_id is None:
+                row = db.execute(
+                    'SELECT id, status, attempts, max_attempts FROM jobs'
+                    ' WHERE (status = ? AND available_at <= ?) OR (status = ? AND lease_expires_at < ?)'
+                    ' ORDER BY available_at LIMIT 1',
+                    (QUEUED, now, RUNNING, now)
+                ).fetchone()
+                if row is None:
+                    break
+                if row['status'] == RUNNING and row['attempts'] >= row['max_attempts']:
+                    db.execute(
+                        'UPDATE jobs SET status = ?, error = ?, lease_owner = NULL, lease_expires_at = NULL,'
+                        ' updated_at = ? WHERE id = ?',
+                        (DEAD, 'Lease expired on the last attempt', now, row['id'])
+                    )
+                    dead.append((row['id'], row['attempts']))
+                    continue
+                job_id = row['id']
+                db.execute(
+                    'UPDATE jobs SET status = ?, attempts = attempts + 1, lease_owner = ?, lease_expires_at = ?,'
+                    ' updated_at = ? WHERE id = ?',
+                    (RUNNING, worker_id, now + lease_seconds, now, job_id)
+                )
+        for dead_id, attempts in dead:
+            logger.error(f'Job {dead_id} dead-lettered after {attempts} attempts: lease expired on the last attempt')
+        return self.get(job_id) if job_id is not None else None
+
+    def heartbeat(self, job_id, worker_id, lease_seconds):
+        now = time.time()
+        db = self._db()
+        with db:
+            cursor = db.execute(
+                'UPDATE jobs SET lease_expires_at = ?, updated_at = ? WHERE id = ? AND status = ? AND lease_owner = ?',
+                (now + lease_seconds, now, job_id, RUNNING, worker_id)
+            )
+        return cursor.rowcount == 1
+
+    def complete(self, job_id, worker_id, result):
+        now = time.time()
+        db = self._db()
+        with db:
+            cursor = db.execute(
+                'UPDATE jobs SET status = ?, result = ?, error = NULL, lease_owner = NULL, lease_expires_at = NULL,'
+                ' updated_at = ? WHERE id = ? AND status = ? AND lease_owner = ?',
+                (SUCCEEDED, result, now, job_id, RUNNING, worker_id)
+            )
+        return cursor.rowcount == 1
+
+    def fail(self, job_id, worker_id, error, retryable=True):
+        now = time.time()
+        db = self._db()
+        with db:
+            db.execute('BEGIN IMMEDIATE')
+            row = db.execute(
+                'SELECT attempts, max_attempts FROM jobs WHERE id = ? AND status = ? AND lease_owner = ?',
+                (job_id, RUNNING, worker_id)
+            ).fetchone()
+            if row is None:
+                return None
+            if not retryable:
+                status, available_at = FAILED, now
+            elif row['attempts'] >= row['max_attempts']:
+                status, available_at = DEAD, now
+            else:
+                # Exponential backoff with jitter so retries of a burst spread out
+                backoff = min(self.retry_base * 2 ** (row['attempts'] - 1), self.retry_max)
+                status, available_at = QUEUED, now + backoff * random.uniform(0.8, 1.2)
+            db.execute(
+                'UPDATE jobs SET status = ?, error = ?, available_at = ?, lease_owner = NULL,'
+                ' lease_expires_at = NULL, updated_at = ? WHERE id = ?',
+                (status, error, available_at, now, job_id)
+            )
+        if status == DEAD:
+            logger.error(f'Job {job_id} dead-lettered after {row["attempts"]} attempts: {error}')
+        return status
+
+    # Delete succeeded, failed and dead jobs last updated before older_than; returns how many
+    def prune(self, older_than):
+        db = self._db()
+        with db:
+            cursor = db.execute(
+                'DELETE FROM jobs WHERE status IN (?, ?, ?) AND updated_at < ?',
+                FINISHED_STATUSES + (older_than,)
+            )
+        if cursor.rowcount:
+            logger.info(f'Pruned {cursor.rowcount} finished jobs')
+        return cursor.rowcount
+
+    def stats(self):
+        rows = self._db().execute('SELECT status, COUNT(*) AS jobs FROM jobs GROUP BY status').fetchall()
+        counts = {status: 0 for status in (QUEUED, RUNNING, SUCCEEDED, FAILED, DEAD)}
+        counts.update({row['status']: row['jobs'] for row in rows})
+        return counts
+
+    # Jobs are only added by enqueue, so pruning from there keeps the table bounded
+    def _prune_if_due(self):
+        now = time.time()
+        if self.retention is None or now - self._last_prune < self.prune_interval:
+            return
+        self._last_prune = now
+        self.prune(now - self.retention)
+
+    # One connection per thread; SQLite connections must not be shared across threads
+    def _db(self):
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.row_factory = sqlite3.Row
+            self._local.db = db
+        return db
+
+
+# Pulls jobs from a JobQueue and runs them through handler(job), which returns
+# the result to store. A heartbeat thread extends the lease while the handler
+# runs; is_retryable(exception) decides between a retry and a terminal failure.
+class JobWorker:
+    def __init__(self, queue, handler, worker_id=None, lease_seconds=60, heartbeat_interval=15,
+                 poll_interval=1.0, is_retryable=lambda e: True):
+        self.queue = queue
+        self.handler = handler
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.lease_seconds = lease_seconds
+        self.heartbeat_interval = heartbeat_interval
+        self.poll_interval = poll_interval
+        self.is_retryable = is_retryable
+
+    def run_forever(self, stop_event=None):
+        stop_event = stop_event or threading.Event()
+        logger.info(f'Job worker {self.worker_id} started')
+        while not stop_event.is_set():
+            try:
+                worked = self.run_once()
+            except Exception:
+                logger.exception('Job worker loop error')
+                worked = False
+            if not worked:
+                stop_event.wait(self.poll_interval)
+
+    # Claim and run a single job; returns False when the queue had nothing ready
+    def run_once(self):
+        job = self.queue.claim(self.worker_id, self.lease_seconds)
+        if job is None:
+            return False
+
+        logger.info(f"Job {job['id']} for video {job['video_id']} claimed (attempt {job['attempts']})")
+        finished = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(job['id'], finished), daemon=True)
+        heartbeat.start()
+        try:
+            result = self.handler(job)
+        except Exception as e:
+            status = self.queue.fail(job['id'], self.worker_id, str(e) or type(e).__name__,
+                                     retryable=self.is_retryable(e))
+            logger.warning(f"Job {job['id']} failed ({status}): {e}")
+        else:
+            if not self.queue.complete(job['id'], self.worker_id, result):
+                logger.warning(f"Job {job['id']} finished after its lease was lost; result discarded")
+        finally:
+            finished.set()
+            heartbeat.join()
+        return True
+
+    def _heartbeat(self, job_id, finished):
+        while not finished.wait(self.heartbeat_interval):
+            if not self.queue.heartbeat(job_id, self.worker_id, self.lease_seconds):
+                logger.warning(f'Lost the lease on job {job_id}')
+                return
@@ -0,0 +1,57 @@
+import collections
+import math
+import threading
+
+
+# Rolling window of recent durations (in seconds) for each phase of a scrape.
+# Successful phases are recorded as they took; a wait that timed out is recorded
+# at its timeout, since all we know is that it took at least that long. Without
+# those, no sample could exceed the current timeout and it could only shrink.
+class LatencyTracker:
+    def __init__(self, window=200, min_samples=20, factor=2.0, floor=5.0):
+        self.window = window
+        self.min_samples = min_samples
+        self.factor = factor
+        self.floor = floor
+        self._lock = threading.Lock()
+        self._samples = collections.defaultdict(lambda: collections.deque(maxlen=self.window))
+
+    # Function to record the phase timings (in milliseconds) of a finished scrape
+    def record(self, timings):
+        with self._lock:
+            for phase, elapsed_ms in timings.items():
+                self._samples[phase].append(elapsed_ms / 1000)
+
+    # Function to record a phase that was cut off at timeout seconds
+    def record_timeout(self, phase, timeout):
+        with self._lock:
+            self._samples[phase].append(timeout)
+
+    # Function to get the q-quantile of a phase, or None until enough samples are in
+    def quantile(self, phase, q):
+        with self._lock:
+            samples = sorted(self._samples.get(phase, ()))
+        if len(samples) < self.min_samples:
+            return None
+        return samples[min(len(samples) - 1, max(0, math.ceil(q * len(samples)) - 1))]
+
+    # Function to get the timeout for a phase: p99 times the factor, kept between
+    # the floor and the configured ceiling, which is also used while warming up
+    def timeout(self, phase, ceiling):
+        p99 = self.quantile(phase, 0.99)
+        if p99 is None:
+            return ceiling
+        return min(max(p99 * self.factor, self.floor), ceiling)
+
+    def stats(self, ceiling=None):
+        with self._lock:
+            phases = {phase: len(samples) for phase, samples in self._samples.items()}
+        stats = {}
+        for phase, count in phases.items():
+            stats[phase] = {'samples': count}
+            for name, q in (('p50', 0.5), ('p95', 0.95), ('p99', 0.99)):
+                value = self.quantile(phase, q)
+                stats[phase][f'{name}_ms'] = round(value * 1000, 1) if value is not None else None
+            if ceiling is not None:
+                stats[phase]['timeout_s'] = round(self.timeout(phase, ceiling), 2)
+        return stats
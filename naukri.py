@@ -0,0 +1,182 @@
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+JOB_CARD_SELECTOR = 'div.srp-jobtuple-wrapper'
+
+
+# Function to build the search results URL; pages after the first get a "-<page>" suffix
+def listing_url(job_title, location, experience, page=1):
+    suffix = f"-{page}" if page > 1 else ""
+    return f"https://www.naukri.com/{job_title.replace(' ', '-')}-jobs-in-{location}{suffix}?experience={experience}"
+
+# Output field -> how to read it inside one job card. A spec has the CSS
+# selector, optionally an attribute or property to read instead of the text
+# ('attr'), 'all' to collect every match as a list (joined with 'join' when
+# given), and a 'default' used when nothing matches; a field without a default
+# is required and a card missing it is skipped. Naukri selector changes only
+# need an edit here.
+JOB_CARD_FIELDS = {
+    "Job Title": {'selector': 'a.title'},
+    "Company Name": {'selector': 'a.comp-name'},
+    "Ratings": {'selector': 'a.rating', 'default': "No rating"},
+    "Experience": {'selector': 'span.expwdth'},
+    "Salary": {'selector': 'span.sal'},
+    "Location": {'selector': 'span.locWdth'},
+    "Job Description (Summary)": {'selector': 'span.job-desc'},
+    "Skills": {'selector': 'ul.tags-gt li', 'all': True},
+    "Posting Date": {'selector': 'span.job-post-day'},
+    "Job Link": {'selector': 'a.title', 'attr': 'href'},
+}
+
+# The same for the job detail page, read from the whole document; dotted names nest
+JOB_DETAIL_FIELDS = {
+    "Job Description": {'selector': 'div.styles_JDC__dang-inner-html__h0K4t', 'default': "Not available"},
+    "Key Skills": {'selector': 'div.styles_key-skill_GIPn_ a', 'all': True, 'join': ', '},
+}
+
+# Labelled "Role: ..." sections of the detail page. Each section label is matched
+# against these labels and the longest one it contains wins, so "Role Category"
+# is not taken for "Role".
+JOB_DETAIL_SECTIONS = {
+    'selector': 'div.styles_details_Y424',
+    'label': 'label',
+    'value': 'span',
+    'fields': {
+        "Role": "Role",
+        "Industry Type": "Industry Type",
+        "Department": "Department",
+        "Employment Type": "Employment Type",
+        "Role Category": "Role Category",
+        "UG": "Education.UG",
+        "PG": "Education.PG",
+    },
+}
+
+# Where the detail fields go in the "Job Details" object, in output order
+JOB_DETAIL_ORDER = (
+    "Job Description", "Role", "Industry Type", "Department", "Employment Type", "Role Category",
+    "Education.UG", "Education.PG", "Key Skills",
+)
+
+# Reads every field of every root element in one round-trip. Returns, per root,
+# the values found (missing ones left out) and, for labelled sections, the value
+# of each matched label.
+EXTRACT_FIELDS_SCRIPT = """
+var rootSelector = arguments[0];
+var fields = arguments[1];
+var sections = arguments[2];
+
+function text(el) {
+    return (el.innerText || el.textContent || '').trim();
+}
+
+function value(el, spec) {
+    if (!spec.attr) {
+        return text(el);
+    }
+    var property = el[spec.attr];
+    return property != null ? String(property) : el.getAttribute(spec.attr);
+}
+
+function readSections(root) {
+    var values = {};
+    var labels = Object.keys(sections.fields);
+    root.querySelectorAll(sections.selector).forEach(function (section) {
+        var labelEl = section.querySelector(sections.label);
+        var valueEl = section.querySelector(sections.value);
+        if (!labelEl || !valueEl) {
+            return;
+        }
+        var label = text(labelEl);
+        var best = null;
+        labels.forEach(function (candidate) {
+            if (label.indexOf(candidate) !== -1 && (best === null || candidate.length > best.length)) {
+                best = candidate;
+            }
+        });
+        if (best !== null) {
+            values[sections.fields[best]] = text(valueEl);
+        }
+    });
+    return values;
+}
+
+function read(root) {
+    var values = {};
+    Object.keys(fields).forEach(function (name) {
+        var spec = fields[name];
+        if (spec.all) {
+            var all = Array.prototype.map.call(root.querySelectorAll(spec.selector), function (el) {
+                return value(el, spec);
+            });
+            values[name] = spec.join != null ? all.join(spec.join) : all;
+            return;
+        }
+        var el = root.querySelector(spec.selector);
+        if (el) {
+            values[name] = value(el, spec);
+        }
+    });
+    if (sections) {
+        var sectionValues = readSections(root);
+        Object.keys(sectionValues).forEach(function (name) {
+            values[name] = sectionValues[name];
+        });
+    }
+    return values;
+}
+
+var roots = rootSelector ? document.querySelectorAll(rootSelector) : [document];
+return JSON.stringify(Array.prototype.map.call(roots, read));
+"""
+
+
+# Function to read fields from every element matching root_selector (or from the
+# whole document when it is None) with a single execute_script call
+def extract_fields(driver, root_selector, fields, sections=None):
+    return json.loads(driver.execute_script(EXTRACT_FIELDS_SCRIPT, root_selector, fields, sections))
+
+
+# Function to apply defaults; returns the completed values and the required fields that are missing
+def complete_fields(values, fields):
+    missing = []
+    for name, spec in fields.items():
+        if name not in values:
+            if 'default' in spec:
+                values[name] = spec['default']
+            else:
+                missing.append(name)
+    return values, missing
+
+
+# Function to turn dotted field names into nested objects, e.g. "Education.UG"
+def nest_fields(values, order):
+    nested = {}
+    for name in order:
+        target = nested
+        *parents, leaf = name.split('.')
+        for parent in parents:
+            target = target.setdefault(parent, {})
+        target[leaf] = values.get(name, "")
+    return nested
+
+
+# Function to extract the basic details of every job card on a listing page in one round-trip
+def extract_job_cards(driver):
+    cards = []
+    for values in extract_fields(driver, JOB_CARD_SELECTOR, JOB_CARD_FIELDS):
+        card, missing = complete_fields(values, JOB_CARD_FIELDS)
+        if missing:
+            logger.warning(f"Skipping a job card without {', '.join(missing)}")
+            continue
+        cards.append({name: card[name] for name in JOB_CARD_FIELDS})
+    return cards
+
+
+# Function to extract the "Job Details" of the detail page in the current tab in one round-trip
+def extract_job_details(driver):
+    values = extract_fields(driver, None, JOB_DETAIL_FIELDS, JOB_DETAIL_SECTIONS)[0]
+    values, _ = complete_fields(values, JOB_DETAIL_FIELDS)
+    return nest_fields(values, JOB_DETAIL_ORDER)
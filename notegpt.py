@@ -0,0 +1,290 @@
+import collections
+import json
+import logging
+import random
+import time
+
+from selenium.common.exceptions import JavascriptException, TimeoutException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+logger = logging.getLogger(__name__)
+
+TRANSCRIPT_ITEM_SELECTOR = "div.ng-transcript-item-text div.text-container"
+
+# Human-like jitter applied around page interactions, as (min, max) seconds.
+# scroll_pause is added to every scroll step of the in-browser extraction.
+StealthProfile = collections.namedtuple('StealthProfile', ['typing_pause', 'click_pause', 'scroll_pause'])
+
+STEALTH_PROFILES = {
+    'human': StealthProfile(typing_pause=(2.0, 5.0), click_pause=(1.0, 3.0), scroll_pause=(0.1, 0.3)),
+    'light': StealthProfile(typing_pause=(0.3, 0.8), click_pause=(0.2, 0.5), scroll_pause=(0.0, 0.05)),
+    'none': StealthProfile(typing_pause=(0.0, 0.0), click_pause=(0.0, 0.0), scroll_pause=(0.0, 0.0)),
+}
+
+
+# Raised when the in-browser extraction runs out of time before reaching the end
+# of the transcript, so a partial transcript is never taken for a whole one
+class TranscriptTruncated(Exception):
+    pass
+
+
+# Function to look up a stealth profile by name
+def get_stealth_profile(name):
+    try:
+        return STEALTH_PROFILES[name]
+    except KeyError:
+        raise ValueError(f"Unknown stealth profile: {name}") from None
+
+
+# Function to sleep for a random duration within a (min, max) range; a zero range is free
+def jitter(pause_range):
+    low, high = pause_range
+    if high > 0:
+        time.sleep(random.uniform(low, high))
+
+
+# Resolves with the first element matching the selector, watching the DOM with a
+# MutationObserver instead of polling; resolves with null when the timeout expires.
+WAIT_FOR_ELEMENT_SCRIPT = """
+var selector = arguments[0];
+var clickable = arguments[1];
+var timeoutMs = arguments[2];
+var done = arguments[arguments.length - 1];
+
+function match() {
+    var el = document.querySelector(selector);
+    if (!el) {
+        return null;
+    }
+    if (clickable) {
+        var rect = el.getBoundingClientRect();
+        if (el.disabled || el.getAttribute('aria-disabled') === 'true' || rect.width === 0 || rect.height === 0) {
+            return null;
+        }
+    }
+    return el;
+}
+
+var found = match();
+if (found) {
+    return done(found);
+}
+var timer = null;
+var observer = new MutationObserver(function () {
+    var el = match();
+    if (el) {
+        observer.disconnect();
+        clearTimeout(timer);
+        done(el);
+    }
+});
+observer.observe(document, {childList: true, subtree: true, attributes: true});
+timer = setTimeout(function () {
+    observer.disconnect();
+    done(null);
+}, timeoutMs);
+"""
+
+
+# Function to wait for an element as soon as the DOM produces it; raises TimeoutException like WebDriverWait
+def wait_for_element(driver, css_selector, timeout, clickable=False):
+    driver.set_script_timeout(timeout + 5)
+    try:
+        element = driver.execute_async_script(
+            WAIT_FOR_ELEMENT_SCRIPT, css_selector, clickable, int(timeout * 1000)
+        )
+    except JavascriptException:
+        # The observer dies with the document (e.g. a navigation); fall back to polling
+        logger.warning(f'DOM observer for {css_selector} was interrupted; polling instead')
+        condition = EC.element_to_be_clickable if clickable else EC.presence_of_element_located
+        return WebDriverWait(driver, timeout, poll_frequency=0.1).until(
+            condition((By.CSS_SELECTOR, css_selector)))
+    if element is None:
+        raise TimeoutException(f"Timed out after {timeout}s waiting for {css_selector}")
+    return element
+
+
+# Scrolls the virtualized transcript list inside the page and collects every
+# rendered item keyed by its position (data-index when the list exposes it,
+# otherwise the item's offset in the scroll content), so repeated lines are
+# kept and the ordered transcript comes back as JSON. Each step proceeds once
+# the list has stopped mutating rather than after a sleep. The scroll state
+# lives on window, so with a chunk budget the script returns the lines found
+# so far and the next call resumes where it left off; without one the whole
+# transcript comes back from a single call.
+EXTRACT_TRANSCRIPT_SCRIPT = """
+var container = arguments[0];
+var itemSelector = arguments[1];
+var quietMs = arguments[2];
+var settleQuietMs = arguments[3];
+var maxWaitMs = arguments[4];
+var scrollPause = arguments[5];
+var budgetMs = arguments[6];
+var chunkMs = arguments[7];
+var done = arguments[arguments.length - 1];
+
+var state = window.__ngTranscriptExtraction;
+if (!state || state.container !== container) {
+    state = window.__ngTranscriptExtraction = {
+        container: container,
+        items: new Map(),
+        emitted: new Set(),
+        steps: 0,
+        lastHeight: -1,
+        waitedAtBottom: false,
+        started: false,
+        deadline: Date.now() + budgetMs,
+        step: Math.max(container.clientHeight - 20, 50)
+    };
+    container.scrollTop = 0;
+}
+var chunkDeadline = chunkMs > 0 ? Date.now() + chunkMs : Infinity;
+
+// Calls back once the container has seen no mutations for `quiet` ms, or after maxWaitMs
+function whenQuiet(quiet, callback) {
+    var finished = false;
+    var timer = null;
+    var observer = new MutationObserver(arm);
+    var cap = setTimeout(fire, Math.max(0, Math.min(maxWaitMs, state.deadline - Date.now())));
+    function fire() {
+        if (finished) {
+            return;
+        }
+        finished = true;
+        observer.disconnect();
+        clearTimeout(timer);
+        clearTimeout(cap);
+        callback();
+    }
+    function arm() {
+        clearTimeout(timer);
+        timer = setTimeout(fire, quiet);
+    }
+    observer.observe(container, {childList: true, subtree: true, characterData: true, attributes: true});
+    arm();
+}
+
+function collect() {
+    var top = container.getBoundingClientRect().top;
+    container.querySelectorAll(itemSelector).forEach(function (node) {
+        var text = (node.innerText || '').trim();
+        if (!text) {
+            return;
+        }
+        var holder = node.closest('[data-index]');
+        var key = holder && container.contains(holder)
+            ? Number(holder.getAttribute('data-index'))
+            : Math.round(node.getBoundingClientRect().top - top + container.scrollTop);
+        state.items.set(key, text);
+    });
+}
+
+function pendingKeys() {
+    return Array.from(state.items.keys())
+        .filter(function (key) { return !state.emitted.has(key); })
+        .sort(function (a, b) { return a - b; });
+}
+
+function emit(finished, truncated) {
+    var keys = pendingKeys();
+    keys.forEach(function (key) { state.emitted.add(key); });
+    if (finished) {
+        delete window.__ngTranscriptExtraction;
+    }
+    done(JSON.stringify({
+        items: keys.map(function (key) { return state.items.get(key); }),
+        done: finished,
+        truncated: truncated,
+        steps: state.steps,
+        scrollHeight: container.scrollHeight
+    }));
+}
+
+function tick() {
+    collect();
+    state.steps += 1;
+    if (Date.now() > state.deadline) {
+        return emit(true, true);
+    }
+    var atBottom = container.scrollTop + container.clientHeight >= container.scrollHeight - 1;
+    if (atBottom) {
+        // Give lazily loaded items one settle window to extend the list before stopping
+        if (state.waitedAtBottom && container.scrollHeight === state.lastHeight) {
+            return emit(true, false);
+        }
+        state.waitedAtBottom = true;
+        state.lastHeight = container.scrollHeight;
+        return whenQuiet(settleQuietMs, tick);
+    }
+    state.waitedAtBottom = false;
+    state.lastHeight = container.scrollHeight;
+    if (Date.now() >= chunkDeadline && pendingKeys().length) {
+        return emit(false, false);
+    }
+    advance();
+}
+
+function advance() {
+    container.scrollTop = container.scrollTop + state.step;
+    var pause = scrollPause[0] + Math.random() * (scrollPause[1] - scrollPause[0]);
+    setTimeout(function () { whenQuiet(quietMs, tick); }, pause);
+}
+
+// Wait for the first items to render and the list to stop filling before scrolling
+function start() {
+    if (!container.querySelector(itemSelector) && Date.now() < state.deadline) {
+        return whenQuiet(quietMs, start);
+    }
+    state.started = true;
+    whenQuiet(settleQuietMs, tick);
+}
+
+if (state.started) {
+    advance();
+} else {
+    start();
+}
+"""
+
+
+# Function to extract the ordered transcript in chunks of lines. With chunk_ms set the
+# browser hands back what it has every chunk_ms; without it there is a single round-trip.
+def iter_transcript_chunks(driver, scrollable_div, timeout=120, stealth=STEALTH_PROFILES['none'],
+                           chunk_ms=None, quiet_ms=50, settle_quiet_ms=500, max_wait_ms=2000):
+    # Leave the script a second of headroom so it can return what it has before Selenium gives up
+    driver.set_script_timeout(timeout)
+    total = 0
+    while True:
+        payload = driver.execute_async_script(
+            EXTRACT_TRANSCRIPT_SCRIPT,
+            scrollable_div,
+            TRANSCRIPT_ITEM_SELECTOR,
+            quiet_ms,
+            settle_quiet_ms,
+            max_wait_ms,
+            [int(stealth.scroll_pause[0] * 1000), int(stealth.scroll_pause[1] * 1000)],
+            max(int(timeout * 1000) - 1000, 0),
+            chunk_ms,
+        )
+        result = json.loads(payload)
+        total += len(result['items'])
+        if result['items']:
+            yield result['items']
+        if result['done']:
+            break
+
+    logger.info(
+        f"Extracted {total} transcript items in {result['steps']} scroll steps "
+        f"(scroll height {result['scrollHeight']})"
+    )
+    if result['truncated']:
+        logger.warning(f'Transcript extraction hit its time budget after {total} items')
+        raise TranscriptTruncated('The transcript could not be extracted completely in time')
+
+
+# Function to extract the full ordered transcript with a single execute_async_script call
+def extract_transcript(driver, scrollable_div, **kwargs):
+    kwargs['chunk_ms'] = None
+    return [line for chunk in iter_transcript_chunks(driver, scrollable_div, **kwargs) for line in chunk]
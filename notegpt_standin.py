@@ -0,0 +1,202 @@
+import argparse
+import json
+import logging
+import time
+
+from flask import Flask, request, jsonify
+
+# Local stand-in for notegpt.io that reproduces the parts of its DOM contract
+# app.py relies on: the YouTube link input, the "Generate Summary" button and a
+# div.ng-transcript list filled from a JSON transcript endpoint. Point the app at
+# it with NOTEGPT_URL=http://127.0.0.1:8001/youtube-video-summarizer.
+#
+# For benchmarks the list can behave like the real one: --virtualized renders only
+# the rows in view (keyed by data-index), --page-size loads the transcript in pages
+# as the list is scrolled to the bottom, and --render-delay-ms / --api-delay-ms
+# stand in for NoteGPT's own processing time.
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+app = Flask(__name__)
+app.config.update(
+    TRANSCRIPT_LINES=200,
+    VIRTUALIZED=False,
+    PAGE_SIZE=0,
+    RENDER_DELAY_MS=0,
+    LAZY_DELAY_MS=200,
+    API_DELAY_MS=0,
+)
+
+# Video IDs the stand-in pretends are not accessible. They must be valid 11-character
+# YouTube IDs, since the service rejects anything else before it scrapes.
+UNAVAILABLE_VIDEO_IDS = {'xUnavail404'}
+
+PAGE = """<!DOCTYPE html>
+<html>
+<head><title>NoteGPT stand-in</title></head>
+<body>
+  <input type="text" placeholder="https://www.youtube.com/watch?v=..." id="link">
+  <button class="el-button ng-script-btn el-button--success" id="generate">Generate Summary</button>
+  <div id="result"></div>
+  <script>
+    var config = __CONFIG__;
+    var ROW_HEIGHT = 24;
+    var OVERSCAN = 4;
+
+    function itemHtml(index, style) {
+      var attributes = config.virtualized ? ' data-index="' + index + '" style="' + style + '"' : '';
+      return '<div class="ng-transcript-item"' + attributes +
+             '><div class="ng-transcript-item-text"><div class="text-container"></div></div></div>';
+    }
+
+    function fetchPage(videoUrl, offset) {
+      var body = {video_url: videoUrl};
+      if (config.page_size > 0) {
+        body.offset = offset;
+        body.limit = config.page_size;
+      }
+      return fetch('/api/v1/transcript', {
+        method: 'POST',
+        headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify(body)
+      }).then(function (response) {
+        return response.ok ? response.json() : null;
+      });
+    }
+
+    function renderList(videoUrl, payload) {
+      var lines = payload.data.transcripts.map(function (item) { return item.text; });
+      var total = payload.data.total;
+      var loading = false;
+      var result = document.getElementById('result');
+      result.innerHTML = '<div class="ng-transcript"><div style="height: 288px; overflow-y: auto;">' +
+                         '<div class="ng-transcript-list" style="position: relative;"></div></div></div>';
+      var scroller = result.querySelector('div[style*="overflow-y"]');
+      var list = result.querySelector('.ng-transcript-list');
+
+      function draw() {
+        var first = 0;
+        var last = lines.length;
+        if (config.virtualized) {
+          list.style.height = (lines.length * ROW_HEIGHT) + 'px';
+          first = Math.max(0, Math.floor(scroller.scrollTop / ROW_HEIGHT) - OVERSCAN);
+          last = Math.min(lines.length, Math.ceil((scroller.scrollTop + scroller.clientHeight) / ROW_HEIGHT) + OVERSCAN);
+        }
+        var html = '';
+        for (var i = first; i < last; i++) {
+          html += itemHtml(i, 'position: absolute; top: ' + (i * ROW_HEIGHT) + 'px; height: ' + ROW_HEIGHT + 'px;');
+        }
+        list.innerHTML = html;
+        var nodes = list.querySelectorAll('div.text-container');
+        for (var j = 0; j < nodes.length; j++) {
+          nodes[j].textContent = lines[first + j];
+        }
+      }
+
+      function loadMore() {
+        if (loading || lines.length >= total) {
+          return;
+        }
+        loading = true;
+        setTimeout(function () {
+          fetchPage(videoUrl, lines.length).then(function (page) {
+            loading = false;
+            if (page) {
+              lines = lines.concat(page.data.transcripts.map(function (item) { return item.text; }));
+              draw();
+            }
+          });
+        }, config.lazy_delay_ms);
+      }
+
+      scroller.addEventListener('scroll', function () {
+        if (config.virtualized) {
+          draw();
+        }
+        if (scroller.scrollTop + scroller.clientHeight >= scroller.scrollHeight - ROW_HEIGHT * 2) {
+          loadMore();
+        }
+      });
+      draw();
+    }
+
+    document.getElementById('generate').addEventListener('click', function () {
+      var videoUrl = document.getElementById('link').value;
+      fetchPage(videoUrl, 0).then(function (payload) {
+        if (payload) {
+          setTimeout(function () { renderList(videoUrl, payload); }, config.render_delay_ms);
+        }
+      });
+    });
+  </script>
+</body>
+</html>
+"""
+
+
+# Function to build the deterministic transcript the stand-in serves for a video
+def build_transcript(video_id, lines):
+    return [
+        {'start': round(index * 2.5, 1), 'text': f"Line {index + 1} of the transcript for {video_id}"}
+        for index in range(lines)
+    ]
+
+
+@app.route('/youtube-video-summarizer', methods=['GET'])
+def summarizer_page():
+    config = {
+        'virtualized': app.config['VIRTUALIZED'],
+        'page_size': app.config['PAGE_SIZE'],
+        'render_delay_ms': app.config['RENDER_DELAY_MS'],
+        'lazy_delay_ms': app.config['LAZY_DELAY_MS'],
+    }
+    return PAGE.replace('__CONFIG__', json.dumps(config))
+
+
+@app.route('/api/v1/transcript', methods=['POST'])
+def transcript_api():
+    payload = request.json or {}
+    video_url = payload.get('video_url', '')
+    video_id = video_url.rsplit('v=', 1)[-1] or 'unknown'
+    if app.config['API_DELAY_MS']:
+        time.sleep(app.config['API_DELAY_MS'] / 1000)
+    if video_id in UNAVAILABLE_VIDEO_IDS:
+        return jsonify({'code': 404, 'message': 'Video not available'}), 404
+
+    # Without a limit the whole transcript comes back in one response
+    transcript = build_transcript(video_id, app.config['TRANSCRIPT_LINES'])
+    offset = int(payload.get('offset', 0))
+    limit = payload.get('limit')
+    page = transcript[offset:offset + int(limit)] if limit else transcript[offset:]
+    return jsonify({
+        'code': 100000,
+        'data': {
+            'videoId': video_id,
+            'total': len(transcript),
+            'transcripts': page,
+        },
+    })
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Local NoteGPT stand-in server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--lines', type=int, default=200, help='Transcript lines served per video')
+    parser.add_argument('--virtualized', action='store_true', help='Only render the rows in view')
+    parser.add_argument('--page-size', type=int, default=0,
+                        help='Load the transcript in pages of this many lines while scrolling (0: all at once)')
+    parser.add_argument('--render-delay-ms', type=int, default=0, help='Delay before the transcript list appears')
+    parser.add_argument('--lazy-delay-ms', type=int, default=200, help='Delay before each further page loads')
+    parser.add_argument('--api-delay-ms', type=int, default=0, help='Server-side latency of the transcript API')
+    args = parser.parse_args()
+    app.config.update(
+        TRANSCRIPT_LINES=args.lines,
+        VIRTUALIZED=args.virtualized,
+        PAGE_SIZE=args.page_size,
+        RENDER_DELAY_MS=args.render_delay_ms,
+        LAZY_DELAY_MS=args.lazy_delay_ms,
+        API_DELAY_MS=args.api_delay_ms,
+    )
+    app.run(host=args.host, port=args.port, threaded=True)
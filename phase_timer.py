@@ -0,0 +1,44 @@
+import collections
+import contextlib
+import time
+
+
+# Raised at the start of a phase once the request that owns the timer has been cancelled
+class PhaseCancelled(Exception):
+    pass
+
+
+# Records how long each named phase of a request took, in milliseconds.
+# current is the phase that last started, so after a failure it names the step that failed;
+# started is when the running phase began, or None between phases; spans keeps
+# (name, started, ended) perf_counter pairs for tracing.
+# Setting the optional cancel event stops the request at its next phase boundary.
+class PhaseTimer:
+    def __init__(self, cancel=None):
+        self.timings = collections.OrderedDict()
+        self.current = None
+        self.started = None
+        self.spans = []
+        self.cancel = cancel
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        if self.cancel is not None and self.cancel.is_set():
+            raise PhaseCancelled(f'Cancelled before {name}')
+        self.current = name
+        self.started = time.perf_counter()
+        try:
+            yield
+        finally:
+            ended = time.perf_counter()
+            self.timings[name] = round((ended - self.started) * 1000, 1)
+            self.spans.append((name, self.started, ended))
+            self.started = None
+
+    # Function to get how long the running phase has taken so far, in seconds
+    def elapsed(self):
+        started = self.started
+        return time.perf_counter() - started if started is not None else None
+
+    def summary(self):
+        return ' '.join(f'{name}={elapsed}ms' for name, elapsed in self.timings.items())
@@ -0,0 +1,147 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from urllib.parse import urlparse
+
+from naukri import JOB_CARD_FIELDS
+
+# Naukri job links end in the numeric job ID, e.g. ...-mumbai-5-to-10-years-101024500123
+JOB_ID_RE = re.compile(r'-(\d{6,})/?$')
+
+# Card fields that make up a posting's fingerprint; the relative posting date
+# ("3 days ago") changes daily without the posting changing, so it is left out
+FINGERPRINT_FIELDS = tuple(name for name in JOB_CARD_FIELDS if name not in ("Posting Date", "Job Link"))
+
+NEW = 'new'
+CHANGED = 'changed'
+UNCHANGED = 'unchanged'
+
+
+# Function to get the stable key of a posting: its Naukri job ID, or the link without its tracking query
+def job_key(job_link):
+    parsed = urlparse(job_link)
+    match = JOB_ID_RE.search(parsed.path)
+    if match:
+        return match.group(1)
+    return f"{parsed.netloc}{parsed.path}"
+
+
+# Function to fingerprint the summary of a job card
+def card_fingerprint(card):
+    summary = json.dumps([card.get(name) for name in FINGERPRINT_FIELDS], ensure_ascii=False)
+    return hashlib.sha256(summary.encode('utf-8')).hexdigest()
+
+
+# Persistent index of the postings seen by earlier crawls, shared by every query.
+# Each posting keeps its detail payload, the fingerprint of its card, and when it
+# was first and last seen; query_jobs remembers which postings each query
+# returned, so a full re-crawl can tell which of them were removed. Every run
+# is logged with its counts.
+class SeenJobIndex:
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.executescript('''
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_key TEXT PRIMARY KEY,
+                job_link TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                details TEXT NOT NULL,
+                first_seen REAL NOT NULL,
+                last_seen REAL NOT NULL);
+            CREATE TABLE IF NOT EXISTS query_jobs (
+                query TEXT NOT NULL,
+                job_key TEXT NOT NULL,
+                last_seen REAL NOT NULL,
+                PRIMARY KEY (query, job_key));
+            CREATE TABLE IF NOT EXISTS runs (
+                id INTEGER PRIMARY KEY,
+                query TEXT NOT NULL,
+                started_at REAL NOT NULL,
+                finished_at REAL NOT NULL,
+                report TEXT NOT NULL);
+        ''')
+        self._db.commit()
+
+    # Function to classify cards against the index; returns (status, stored details)
+    # per card, with stored details only for unchanged postings
+    def classify(self, cards):
+        keys = [job_key(card["Job Link"]) for card in cards]
+        with self._lock:
+            rows = {}
+            for key in keys:
+                row = self._db.execute(
+                    'SELECT fingerprint, details FROM jobs WHERE job_key = ?', (key,)).fetchone()
+                if row is not None:
+                    rows[key] = row
+        results = []
+        for key, card in zip(keys, cards):
+            row = rows.get(key)
+            if row is None:
+                results.append((NEW, None))
+            elif row[0] != card_fingerprint(card):
+                results.append((CHANGED, None))
+            else:
+                results.append((UNCHANGED, json.loads(row[1])))
+        return results
+
+    # Function to store a posting seen by a query, with its (fresh or reused) details
+    def record(self, query, card, details, seen_at=None):
+        seen_at = seen_at or time.time()
+        key = job_key(card["Job Link"])
+        with self._lock, self._db:
+            self._db.execute(
+                'INSERT INTO jobs (job_key, job_link, fingerprint, details, first_seen, last_seen)'
+                ' VALUES (?, ?, ?, ?, ?, ?)'
+                ' ON CONFLICT (job_key) DO UPDATE SET job_link = excluded.job_link,'
+                ' fingerprint = excluded.fingerprint, details = excluded.details, last_seen = excluded.last_seen',
+                (key, card["Job Link"], card_fingerprint(card), json.dumps(details, ensure_ascii=False),
+                 seen_at, seen_at))
+            self._db.execute(
+                'INSERT OR REPLACE INTO query_jobs (query, job_key, last_seen) VALUES (?, ?, ?)',
+                (query, key, seen_at))
+
+    # Function to close a run: with exhausted=True (every result page was crawled) the
+    # postings the query returned before but not since started_at are reported as
+    # removed and forgotten for the query. Logs and returns the run report.
+    def finish_run(self, query, started_at, counts, exhausted):
+        removed = None
+        with self._lock, self._db:
+            if exhausted:
+                removed = [row[0] for row in self._db.execute(
+                    'SELECT jobs.job_link FROM query_jobs JOIN jobs ON jobs.job_key = query_jobs.job_key'
+                    ' WHERE query_jobs.query = ? AND query_jobs.last_seen < ?', (query, started_at))]
+                self._db.execute(
+                    'DELETE FROM query_jobs WHERE query = ? AND last_seen < ?', (query, started_at))
+            report = dict(counts, removed=removed)
+            self._db.execute(
+                'INSERT INTO runs (query, started_at, finished_at, report) VALUES (?, ?, ?, ?)',
+                (query, started_at, time.time(), json.dumps(report)))
+        return report
+
+    # Function to list the latest runs, newest first, optionally for one query
+    def runs(self, query=None, limit=20):
+        sql = 'SELECT query, started_at, finished_at, report FROM runs'
+        params = ()
+        if query is not None:
+            sql += ' WHERE query = ?'
+            params = (query,)
+        with self._lock:
+            rows = self._db.execute(sql + ' ORDER BY id DESC LIMIT ?', params + (limit,)).fetchall()
+        return [
+            dict(json.loads(report), query=query, started_at=started_at, finished_at=finished_at)
+            for query, started_at, finished_at, report in rows
+        ]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
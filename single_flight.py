@@ -0,0 +1,108 @@
+import contextlib
+import logging
+import os
+import re
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows; fall back to in-process coalescing only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+LOCK_NAME_RE = re.compile(r'[^A-Za-z0-9_-]')
+
+
+# Raised when a follower gives up waiting on the leader's result
+class SingleFlightTimeout(Exception):
+    pass
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.followers = 0
+
+
+# Coalesces concurrent calls for the same key so that only one of them runs.
+# Threads of one process wait on the leader's in-memory result; leaders of
+# different processes serialise on a per-key flock() lease in lock_dir, which
+# the kernel releases if the holding worker dies, so the next leader can pick
+# up whatever the previous one stored (e.g. in a shared cache).
+class SingleFlight:
+    def __init__(self, lock_dir=None, timeout=300, poll_interval=0.05):
+        self.lock_dir = lock_dir
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+
+        self._calls = {}
+        self._lock = threading.Lock()
+        if lock_dir and fcntl is not None:
+            os.makedirs(lock_dir, exist_ok=True)
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+            else:
+                call.followers += 1
+
+        if not leader:
+            logger.info(f'Waiting on in-flight call for {key}')
+            if not call.done.wait(self.timeout):
+                raise SingleFlightTimeout(f"Timed out waiting on in-flight call for {key}")
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            with self._process_lease(key):
+                call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def in_flight(self):
+        with self._lock:
+            return {key: call.followers for key, call in self._calls.items()}
+
+    @contextlib.contextmanager
+    def _process_lease(self, key):
+        if not self.lock_dir or fcntl is None:
+            yield
+            return
+
+        path = os.path.join(self.lock_dir, LOCK_NAME_RE.sub('_', key) + '.lock')
+        with open(path, 'a') as lock_file:
+            deadline = time.monotonic() + self.timeout
+            acquired = False
+            while True:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    acquired = True
+                    break
+                except BlockingIOError:
+                    if time.monotonic() >= deadline:
+                        break
+                    time.sleep(self.poll_interval)
+
+            if not acquired:
+                # Fail open rather than erroring out behind a stuck lease holder
+                logger.warning(f'Could not acquire cross-process lease for {key}; proceeding without it')
+            try:
+                yield
+            finally:
+                if acquired:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
@@ -1,12 +1,20 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
+import collections
+import json
+import os
 import time
 
+from naukri import extract_job_cards, extract_job_details, listing_url
+from job_export import FORMATS, ExportUnavailable, open_writer
+from seen_jobs import SeenJobIndex, job_key, NEW, CHANGED, UNCHANGED
+
 app = Flask(__name__)
 
 # Set up Chrome WebDriver
@@ -22,6 +30,180 @@ options.add_argument('--disable-dev-shm-usage')
 options.add_argument("window-size=1920x1080")
 options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/94.0.4606.61 Safari/537.36")
 
+# Detail pages loading at once in background tabs, and how long to wait for one to render
+DETAIL_PARALLELISM = int(os.environ.get('DETAIL_PARALLELISM', '4'))
+DETAIL_PAGE_TIMEOUT = float(os.environ.get('DETAIL_PAGE_TIMEOUT', '15'))
+
+# Upper bound on result pages one request may crawl, and where exported files are written
+MAX_PAGES = int(os.environ.get('MAX_PAGES', '50'))
+EXPORT_DIR = os.environ.get('EXPORT_DIR', 'data/exports')
+
+# Seen-job index: postings already crawled keep their details, which are only fetched
+# again when the posting's card changes
+INCREMENTAL_CRAWL = os.environ.get('INCREMENTAL_CRAWL', '1') == '1'
+SEEN_JOBS_PATH = os.environ.get('SEEN_JOBS_PATH', 'data/seen_jobs.sqlite3')
+seen_job_index = SeenJobIndex(SEEN_JOBS_PATH)
+
+# Any of these on a detail page means its content has rendered
+DETAIL_READY_SELECTOR = 'div.styles_JDC__dang-inner-html__h0K4t, div.styles_details_Y424, div.styles_key-skill_GIPn_'
+
+# Function to open a page in a new background tab without waiting for it to load
+def open_tab(driver, url):
+    handles = set(driver.window_handles)
+    driver.execute_script("window.open(arguments[0], '_blank');", url)
+    return (set(driver.window_handles) - handles).pop()
+
+# Function to fetch the detail pages of job_links, keeping up to `parallelism` of them
+# loading in background tabs while the oldest one is scraped. Returns the details in
+# the order of job_links, with None for pages that could not be scraped.
+def fetch_job_details(driver, job_links, parallelism):
+    listing = driver.current_window_handle
+    details = [None] * len(job_links)
+    loading = collections.deque()
+    next_index = 0
+
+    while next_index < len(job_links) or loading:
+        # Top the window of loading tabs back up before waiting on the oldest one
+        driver.switch_to.window(listing)
+        while next_index < len(job_links) and len(loading) < parallelism:
+            loading.append((next_index, open_tab(driver, job_links[next_index])))
+            next_index += 1
+
+        index, handle = loading.popleft()
+        driver.switch_to.window(handle)
+        try:
+            # Wait for the detailed job page to render instead of sleeping a fixed time
+            try:
+                WebDriverWait(driver, DETAIL_PAGE_TIMEOUT).until(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, DETAIL_READY_SELECTOR))
+                )
+            except TimeoutException:
+                # Leave it as None so the half-rendered page is not recorded and the next run refetches it
+                print(f"Timed out waiting for job details, skipping: {job_links[index]}")
+                continue
+            details[index] = extract_job_details(driver)
+        except Exception as e:
+            print(f"Error extracting data for a job: {e}")
+        finally:
+            driver.close()
+
+    driver.switch_to.window(listing)
+    return details
+
+# Function to name a search in the seen-job index
+def crawl_query(job_title, location, experience):
+    return f"{job_title}|{location}|{experience}".lower()
+
+# Function to crawl up to max_pages result pages, one page at a time so memory stays flat.
+# Yields NDJSON-style records: a 'job' record for every posting in listing order, a 'page'
+# record with progress after each page and a final 'complete' record. With a seen-job index,
+# detail pages are only fetched for new postings and postings whose card changed; the
+# others reuse their stored details, and the 'complete' record reports the run.
+def crawl_jobs(driver, job_title, location, experience, max_pages, parallelism, seen_jobs=None):
+    started = time.monotonic()
+    run_started = time.time()
+    query = crawl_query(job_title, location, experience)
+    seen_keys = set()
+    counts = collections.Counter()
+    total = pages = 0
+    exhausted = False
+
+    for page in range(1, max_pages + 1):
+        driver.get(listing_url(job_title, location, experience, page))
+
+        # Wait explicitly for the job listings to appear; past the last page there are none
+        try:
+            WebDriverWait(driver, 20).until(
+                EC.presence_of_all_elements_located((By.CSS_SELECTOR, 'div.srp-jobtuple-wrapper'))
+            )
+        except TimeoutException:
+            if page == 1:
+                raise
+            exhausted = True
+            break
+
+        # Read every card on the listing tab in one script call.
+        # Listings shift while they are paged through, so postings already seen are skipped.
+        cards = [card for card in extract_job_cards(driver) if job_key(card["Job Link"]) not in seen_keys]
+        if not cards:
+            exhausted = True
+            break
+        seen_keys.update(job_key(card["Job Link"]) for card in cards)
+
+        # Load only the detail pages we have no current copy of, concurrently
+        if seen_jobs is not None:
+            statuses = seen_jobs.classify(cards)
+        else:
+            statuses = [(None, None)] * len(cards)
+        to_fetch = [index for index, (_, stored) in enumerate(statuses) if stored is None]
+        details = [stored for _, stored in statuses]
+        fetched = fetch_job_details(driver, [cards[index]["Job Link"] for index in to_fetch], parallelism)
+        for index, job_details in zip(to_fetch, fetched):
+            details[index] = job_details
+
+        page_counts = collections.Counter()
+        for card, (status, _), job_details in zip(cards, statuses, details):
+            if job_details is None:
+                continue
+            if seen_jobs is not None:
+                seen_jobs.record(query, card, job_details)
+            page_counts[status] += 1
+            yield {"type": "job", "status": status, "job": dict(card, **{"Job Details": job_details})}
+
+        pages = page
+        page_jobs = sum(page_counts.values())
+        counts.update(page_counts)
+        total += page_jobs
+        elapsed = time.monotonic() - started
+        progress = {
+            "type": "page",
+            "page": page,
+            "jobs": page_jobs,
+            "details_fetched": len(to_fetch),
+            "total": total,
+            "elapsed_s": round(elapsed, 1),
+            "jobs_per_s": round(total / elapsed, 2) if elapsed else None,
+        }
+        if seen_jobs is not None:
+            progress.update({status: page_counts[status] for status in (NEW, CHANGED, UNCHANGED)})
+        print(f"Page {page}: {page_jobs} jobs ({len(to_fetch)} detail pages fetched), "
+              f"{total} in total, {progress['jobs_per_s']} jobs/s")
+        yield progress
+
+    complete = {"type": "complete", "pages": pages, "jobs": total}
+    if seen_jobs is not None:
+        # Postings missing from a crawl that stopped at the page limit may just be on later pages
+        report = seen_jobs.finish_run(
+            query, run_started, {status: counts[status] for status in (NEW, CHANGED, UNCHANGED)}, exhausted)
+        complete.update(report)
+        print(f"Crawl of {query}: {report[NEW]} new, {report[CHANGED]} changed, {report[UNCHANGED]} unchanged, "
+              f"{len(report['removed']) if report['removed'] is not None else 'unknown'} removed")
+    yield complete
+
+# Function to crawl with a driver of its own and export the jobs as NDJSON records: each job
+# is streamed as a 'job' record, or written to the export file when a writer is given, followed
+# by a 'page' record per page and a final 'complete' or 'error' record
+def stream_jobs(input_data, max_pages, parallelism, seen_jobs, writer=None, path=None):
+    driver = webdriver.Chrome(service=service, options=options)
+    try:
+        for record in crawl_jobs(
+                driver, input_data.get('job', 'Data Scientist'), input_data.get('location', 'Mumbai'),
+                input_data.get('experience', '5'), max_pages, parallelism, seen_jobs):
+            if record["type"] == 'job' and writer is not None:
+                writer.write(record["job"])
+                continue
+            if record["type"] == 'complete' and writer is not None:
+                writer.close()
+                writer = None
+                record["file"] = path
+            yield json.dumps(record, ensure_ascii=False) + '\n'
+    except Exception as e:
+        yield json.dumps({"type": "error", "error": str(e)}) + '\n'
+    finally:
+        if writer is not None:
+            writer.close()
+        driver.quit()
+
 # Define a route to scrape jobs
 @app.route('/scrape_jobs', methods=['POST'])
 def scrape_jobs():
@@ -29,126 +211,41 @@ def scrape_jobs():
     job_title = input_data.get('job', 'Data Scientist')  # Default to 'Data Scientist' if not provided
     location = input_data.get('location', 'Mumbai')  # Default to 'Mumbai' if not provided
     experience = input_data.get('experience', '5')  # Default to '5' years if not provided
+    parallelism = max(int(input_data.get('parallelism', DETAIL_PARALLELISM)), 1)  # Detail pages loading at once
+    max_pages = min(max(int(input_data.get('max_pages', 1)), 1), MAX_PAGES)  # Result pages to crawl
+    export_format = input_data.get('format', 'json')  # json, ndjson, csv or parquet
+    # Reuse stored details of unchanged postings unless the request asks for a full re-crawl
+    seen_jobs = seen_job_index if input_data.get('incremental', INCREMENTAL_CRAWL) else None
 
-    driver = webdriver.Chrome(service=service, options=options)
-
-    try:
-        # Construct the URL based on inputs
-        url = f"https://www.naukri.com/{job_title.replace(' ', '-')}-jobs-in-{location}?experience={experience}"
-        driver.get(url)
+    # Stream NDJSON records as the crawl runs, or write the jobs to a file in EXPORT_DIR and
+    # stream the progress; nothing is accumulated either way
+    if export_format != 'json':
+        if export_format not in FORMATS:
+            return jsonify({"error": f"Unknown format: {export_format}"}), 400
+        output = input_data.get('output')
+        if export_format == 'ndjson' and not output:
+            return Response(stream_jobs(input_data, max_pages, parallelism, seen_jobs),
+                            mimetype='application/x-ndjson')
 
-        # Wait explicitly for the job listings to appear
-        WebDriverWait(driver, 20).until(
-            EC.presence_of_all_elements_located((By.CSS_SELECTOR, 'div.srp-jobtuple-wrapper'))
-        )
+        slug = f"{job_title}-{location}".replace(' ', '-').lower()
+        name = os.path.basename(output or f"{slug}-{int(time.time())}.{export_format}")
+        os.makedirs(EXPORT_DIR, exist_ok=True)
+        path = os.path.join(EXPORT_DIR, name)
+        try:
+            writer = open_writer(path, export_format)
+        except ExportUnavailable as e:
+            return jsonify({"error": str(e)}), 400
+        return Response(stream_jobs(input_data, max_pages, parallelism, seen_jobs, writer, path),
+                        mimetype='application/x-ndjson')
 
-        # Find all job listings
-        jobs = driver.find_elements(By.CSS_SELECTOR, 'div.srp-jobtuple-wrapper')
+    driver = webdriver.Chrome(service=service, options=options)
 
-        # List to hold all job data
+    try:
+        # List to hold all job data, in listing order
         job_data_list = []
-
-        for job in jobs:
-            try:
-                # Extract basic details from the job card
-                job_title = job.find_element(By.CSS_SELECTOR, 'a.title').text
-                company_name = job.find_element(By.CSS_SELECTOR, 'a.comp-name').text
-                rating_element = job.find_elements(By.CSS_SELECTOR, 'a.rating')
-                ratings = rating_element[0].text if rating_element else "No rating"
-                experience = job.find_element(By.CSS_SELECTOR, 'span.expwdth').text
-                salary = job.find_element(By.CSS_SELECTOR, 'span.sal').text
-                location = job.find_element(By.CSS_SELECTOR, 'span.locWdth').text
-                job_description_summary = job.find_element(By.CSS_SELECTOR, 'span.job-desc').text
-                skills_elements = job.find_elements(By.CSS_SELECTOR, 'ul.tags-gt li')
-                skills = [skill.text for skill in skills_elements]
-                posting_date = job.find_element(By.CSS_SELECTOR, 'span.job-post-day').text
-                job_link = job.find_element(By.CSS_SELECTOR, 'a.title').get_attribute('href')
-
-                # Open the job detailed page to get more info
-                driver.execute_script("window.open(arguments[0], '_blank');", job_link)
-                driver.switch_to.window(driver.window_handles[1])
-                time.sleep(3)  # Wait for the detailed job page to load
-
-                # Extract additional details
-                role = industry_type = department = employment_type = role_category = education_ug = education_pg = key_skills = ""
-
-                try:
-                    sections = driver.find_elements(By.CSS_SELECTOR, 'div.styles_details_Y424')
-                    for section in sections:
-                        try:
-                            label = section.find_element(By.CSS_SELECTOR, 'label').text.strip()
-                            value = section.find_element(By.CSS_SELECTOR, 'span').text.strip()
-
-                            if "Role" in label:
-                                role = value
-                            elif "Industry Type" in label:
-                                industry_type = value
-                            elif "Department" in label:
-                                department = value
-                            elif "Employment Type" in label:
-                                employment_type = value
-                            elif "Role Category" in label:
-                                role_category = value
-                            elif "UG" in label:
-                                education_ug = value
-                            elif "PG" in label:
-                                education_pg = value
-                        except:
-                            continue
-
-                except Exception as e:
-                    print(f"Error extracting additional details: {e}")
-
-                # Extract detailed job description
-                try:
-                    job_desc_section = driver.find_element(By.CSS_SELECTOR, 'div.styles_JDC__dang-inner-html__h0K4t').text
-                except:
-                    job_desc_section = "Not available"
-
-                # Extract key skills
-                try:
-                    key_skills_elements = driver.find_elements(By.CSS_SELECTOR, 'div.styles_key-skill_GIPn_ a')
-                    key_skills = ', '.join([skill.text for skill in key_skills_elements])
-                except:
-                    key_skills = ""
-
-                # Create job dictionary with all details
-                job_data = {
-                    "Job Title": job_title,
-                    "Company Name": company_name,
-                    "Ratings": ratings,
-                    "Experience": experience,
-                    "Salary": salary,
-                    "Location": location,
-                    "Job Description (Summary)": job_description_summary,
-                    "Skills": skills,
-                    "Posting Date": posting_date,
-                    "Job Link": job_link,
-                    "Job Details": {
-                        "Job Description": job_desc_section,
-                        "Role": role,
-                        "Industry Type": industry_type,
-                        "Department": department,
-                        "Employment Type": employment_type,
-                        "Role Category": role_category,
-                        "Education": {
-                            "UG": education_ug,
-                            "PG": education_pg
-                        },
-                        "Key Skills": key_skills
-                    }
-                }
-
-                # Add the job data to the list
-                job_data_list.append(job_data)
-
-                # Close the detailed job tab and switch back to the listing tab
-                driver.close()
-                driver.switch_to.window(driver.window_handles[0])
-                time.sleep(2)
-
-            except Exception as e:
-                print(f"Error extracting data for a job: {e}")
+        for record in crawl_jobs(driver, job_title, location, experience, max_pages, parallelism, seen_jobs):
+            if record["type"] == 'job':
+                job_data_list.append(record["job"])
 
         return jsonify(job_data_list)
 
@@ -158,5 +255,14 @@ def scrape_jobs():
     finally:
         driver.quit()
 
+# Report of the latest crawls (new, changed, unchanged and removed postings), optionally for one search
+@app.route('/crawl_runs', methods=['GET'])
+def crawl_runs():
+    query = None
+    if 'job' in request.args or 'location' in request.args or 'experience' in request.args:
+        query = crawl_query(request.args.get('job', 'Data Scientist'), request.args.get('location', 'Mumbai'),
+                            request.args.get('experience', '5'))
+    return jsonify(seen_job_index.runs(query, limit=int(request.args.get('limit', 20))))
+
 if __name__ == "__main__":
     app.run(debug=True)
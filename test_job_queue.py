@@ -0,0 +1,82 @@
+import time
+
+from job_queue import SQLiteJobQueue, DEAD, RUNNING, SUCCEEDED
+
+
+# Function to let every current lease run out
+def expire_leases(queue):
+    db = queue._db()
+    with db:
+        db.execute('UPDATE jobs SET lease_expires_at = ? WHERE status = ?', (time.time() - 1, RUNNING))
+
+
+def test_expired_lease_is_claimed_again(tmp_path):
+    queue = SQLiteJobQueue(str(tmp_path / 'jobs.sqlite3'), max_attempts=3)
+    job = queue.enqueue('dQw4w9WgXcQ')
+
+    assert queue.claim('worker-1', 60)['attempts'] == 1
+    expire_leases(queue)
+    claimed = queue.claim('worker-2', 60)
+
+    assert claimed['id'] == job['id']
+    assert claimed['attempts'] == 2
+    assert claimed['lease_owner'] == 'worker-2'
+
+
+def test_expired_lease_on_last_attempt_is_dead_lettered(tmp_path):
+    queue = SQLiteJobQueue(str(tmp_path / 'jobs.sqlite3'), max_attempts=2)
+    job = queue.enqueue('dQw4w9WgXcQ')
+
+    for worker_id in ('worker-1', 'worker-2'):
+        assert queue.claim(worker_id, 60)['id'] == job['id']
+        expire_leases(queue)
+
+    assert queue.claim('worker-3', 60) is None
+    dead = queue.get(job['id'])
+    assert dead['status'] == DEAD
+    assert dead['attempts'] == 2
+    assert dead['lease_owner'] is None
+    assert queue.stats()[DEAD] == 1
+
+
+def test_dead_lettering_does_not_block_other_jobs(tmp_path):
+    queue = SQLiteJobQueue(str(tmp_path / 'jobs.sqlite3'), max_attempts=1)
+    stuck = queue.enqueue('dQw4w9WgXcQ')
+    queue.claim('worker-1', 60)
+    expire_leases(queue)
+    waiting = queue.enqueue('9bZkp7q1VDM')
+
+    claimed = queue.claim('worker-2', 60)
+
+    assert claimed['id'] == waiting['id']
+    assert queue.get(stuck['id'])['status'] == DEAD
+
+
+def test_cached_result_reuses_the_finished_job(tmp_path):
+    queue = SQLiteJobQueue(str(tmp_path / 'jobs.sqlite3'))
+    first = queue.enqueue('dQw4w9WgXcQ', result='transcript')
+
+    assert queue.enqueue('dQw4w9WgXcQ', result='transcript')['id'] == first['id']
+    assert queue.enqueue('dQw4w9WgXcQ', result='new transcript')['id'] != first['id']
+    assert queue.stats()[SUCCEEDED] == 2
+
+
+def test_prune_only_removes_old_finished_jobs(tmp_path):
+    queue = SQLiteJobQueue(str(tmp_path / 'jobs.sqlite3'))
+    finished = queue.enqueue('dQw4w9WgXcQ', result='transcript')
+    queued = queue.enqueue('9bZkp7q1VDM')
+
+    assert queue.prune(time.time() - 60) == 0
+    assert queue.prune(time.time() + 1) == 1
+    assert queue.get(finished['id']) is None
+    assert queue.get(queued['id']) is not None
+
+
+def test_enqueue_prunes_past_the_retention(tmp_path):
+    queue = SQLiteJobQueue(str(tmp_path / 'jobs.sqlite3'), retention=0, prune_interval=0)
+    finished = queue.enqueue('dQw4w9WgXcQ', result='transcript')
+    time.sleep(0.01)
+
+    queue.enqueue('9bZkp7q1VDM')
+
+    assert queue.get(finished['id']) is None
@@ -0,0 +1,34 @@
+from transcript_search import TranscriptIndex
+
+
+def test_one_video_does_not_crowd_out_the_others(tmp_path):
+    index = TranscriptIndex(str(tmp_path / 'index.sqlite3'))
+    index.add('aaaaaaaaaaa', '\n'.join(f'python line {number}' for number in range(300)))
+    index.add('bbbbbbbbbbb', 'learning python today')
+    index.add('ccccccccccc', 'python tips')
+
+    results = index.search('python', limit=20)
+
+    assert sorted(result['video_id'] for result in results) == ['aaaaaaaaaaa', 'bbbbbbbbbbb', 'ccccccccccc']
+    assert len(next(r for r in results if r['video_id'] == 'aaaaaaaaaaa')['matches']) == 5
+
+
+def test_limit_counts_videos(tmp_path):
+    index = TranscriptIndex(str(tmp_path / 'index.sqlite3'))
+    for video_id in ('aaaaaaaaaaa', 'bbbbbbbbbbb', 'ccccccccccc'):
+        index.add(video_id, 'python\npython again')
+
+    results = index.search('python', limit=2, per_video=1)
+
+    assert len(results) == 2
+    assert all(len(result['matches']) == 1 for result in results)
+
+
+def test_invalid_syntax_falls_back_to_quoted_terms(tmp_path):
+    index = TranscriptIndex(str(tmp_path / 'index.sqlite3'))
+    index.add('aaaaaaaaaaa', "don't panic")
+
+    results = index.search("don't")
+
+    assert [result['video_id'] for result in results] == ['aaaaaaaaaaa']
+    assert results[0]['matches'][0]['snippet'] == "[don't] panic"
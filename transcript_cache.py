@@ -0,0 +1,224 @@
+import collections
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from urllib.parse import urlparse, parse_qs
+
+logger = logging.getLogger(__name__)
+
+VIDEO_ID_RE = re.compile(r'^[A-Za-z0-9_-]{11}$')
+YOUTUBE_HOSTS = {
+    'youtube.com', 'www.youtube.com', 'm.youtube.com', 'music.youtube.com',
+    'youtube-nocookie.com', 'www.youtube-nocookie.com',
+}
+# Path prefixes that are followed directly by the video ID
+VIDEO_PATH_PREFIXES = ('shorts', 'embed', 'live', 'v', 'e')
+
+
+# Function to parse the canonical 11-character video ID out of any YouTube URL form
+def extract_video_id(video_url):
+    if not video_url:
+        return None
+    video_url = video_url.strip()
+    if VIDEO_ID_RE.match(video_url):
+        return video_url
+    if '://' not in video_url:
+        video_url = 'https://' + video_url
+
+    parsed = urlparse(video_url)
+    host = (parsed.hostname or '').lower()
+    segments = [s for s in parsed.path.split('/') if s]
+
+    candidate = None
+    if host in ('youtu.be', 'www.youtu.be'):
+        candidate = segments[0] if segments else None
+    elif host in YOUTUBE_HOSTS:
+        query_ids = parse_qs(parsed.query).get('v')
+        if query_ids:
+            candidate = query_ids[0]
+        elif len(segments) >= 2 and segments[0] in VIDEO_PATH_PREFIXES:
+            candidate = segments[1]
+
+    if candidate and VIDEO_ID_RE.match(candidate):
+        return candidate
+    return None
+
+
+# Function to build the URL we hand to NoteGPT for a video ID
+def canonical_video_url(video_id):
+    return f"https://www.youtube.com/watch?v={video_id}"
+
+
+# Two-tier transcript cache: a bounded in-memory LRU in front of a SQLite file
+# that is shared by all gunicorn workers and survives restarts. Compressed
+# response bodies are kept alongside the transcripts, tagged with the ETag of
+# the transcript they were made from, so each is only compressed once.
+class TranscriptCache:
+    def __init__(self, path, max_entries=256, ttl=7 * 24 * 3600):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+
+        self._memory = collections.OrderedDict()
+        self._encoded = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = collections.Counter()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS transcripts ('
+            ' video_id TEXT PRIMARY KEY,'
+            ' transcript TEXT NOT NULL,'
+            ' created_at REAL NOT NULL)'
+        )
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS encoded_transcripts ('
+            ' video_id TEXT NOT NULL,'
+            ' encoding TEXT NOT NULL,'
+            ' etag TEXT NOT NULL,'
+            ' body BLOB NOT NULL,'
+            ' PRIMARY KEY (video_id, encoding))'
+        )
+        self._db.commit()
+
+    def get(self, video_id, record_stats=True):
+        counters = self._counters if record_stats else collections.Counter()
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(video_id)
+            if entry is not None:
+                transcript, created_at = entry
+                if now - created_at < self.ttl:
+                    self._memory.move_to_end(video_id)
+                    counters['memory_hits'] += 1
+                    return transcript
+                del self._memory[video_id]
+                self._counters['expired'] += 1
+
+            row = self._db.execute(
+                'SELECT transcript, created_at FROM transcripts WHERE video_id = ?',
+                (video_id,)
+            ).fetchone()
+            if row is not None:
+                transcript, created_at = row
+                if now - created_at < self.ttl:
+                    self._remember(video_id, transcript, created_at)
+                    counters['disk_hits'] += 1
+                    return transcript
+                self._db.execute('DELETE FROM transcripts WHERE video_id = ?', (video_id,))
+                self._forget_encoded(video_id)
+                self._db.commit()
+                self._counters['expired'] += 1
+
+            counters['misses'] += 1
+            return None
+
+    def set(self, video_id, transcript):
+        created_at = time.time()
+        with self._lock:
+            self._remember(video_id, transcript, created_at)
+            self._db.execute(
+                'INSERT OR REPLACE INTO transcripts (video_id, transcript, created_at) VALUES (?, ?, ?)',
+                (video_id, transcript, created_at)
+            )
+            self._forget_encoded(video_id)
+            self._db.commit()
+
+    # Drop a video from both tiers; returns True if anything was removed
+    def invalidate(self, video_id):
+        with self._lock:
+            in_memory = self._memory.pop(video_id, None) is not None
+            cursor = self._db.execute('DELETE FROM transcripts WHERE video_id = ?', (video_id,))
+            self._forget_encoded(video_id)
+            self._db.commit()
+            self._counters['invalidations'] += 1
+            return in_memory or cursor.rowcount > 0
+
+    # Function to get a compressed response body, if one was stored for the transcript with this ETag
+    def get_encoded(self, video_id, encoding, etag):
+        key = (video_id, encoding)
+        with self._lock:
+            entry = self._encoded.get(key)
+            if entry is None:
+                entry = self._db.execute(
+                    'SELECT etag, body FROM encoded_transcripts WHERE video_id = ? AND encoding = ?',
+                    key
+                ).fetchone()
+                if entry is not None:
+                    self._remember_encoded(key, entry[0], entry[1])
+            if entry is not None and entry[0] == etag:
+                self._encoded.move_to_end(key)
+                self._counters['encoded_hits'] += 1
+                return entry[1]
+            self._counters['encoded_misses'] += 1
+            return None
+
+    def set_encoded(self, video_id, encoding, etag, body):
+        key = (video_id, encoding)
+        with self._lock:
+            self._remember_encoded(key, etag, body)
+            self._db.execute(
+                'INSERT OR REPLACE INTO encoded_transcripts (video_id, encoding, etag, body) VALUES (?, ?, ?, ?)',
+                (video_id, encoding, etag, body)
+            )
+            self._db.commit()
+
+    # Function to list (video_id, transcript) for every transcript stored on disk, expired or not
+    def iter_transcripts(self):
+        with self._lock:
+            video_ids = [row[0] for row in self._db.execute('SELECT video_id FROM transcripts')]
+        for video_id in video_ids:
+            with self._lock:
+                row = self._db.execute(
+                    'SELECT transcript FROM transcripts WHERE video_id = ?', (video_id,)).fetchone()
+            if row is not None:
+                yield video_id, row[0]
+
+    def stats(self):
+        with self._lock:
+            disk_entries = self._db.execute('SELECT COUNT(*) FROM transcripts').fetchone()[0]
+            counters = dict(self._counters)
+            memory_entries = len(self._memory)
+        hits = counters.get('memory_hits', 0) + counters.get('disk_hits', 0)
+        lookups = hits + counters.get('misses', 0)
+        return {
+            'memory_entries': memory_entries,
+            'disk_entries': disk_entries,
+            'memory_hits': counters.get('memory_hits', 0),
+            'disk_hits': counters.get('disk_hits', 0),
+            'misses': counters.get('misses', 0),
+            'expired': counters.get('expired', 0),
+            'invalidations': counters.get('invalidations', 0),
+            'hit_ratio': hits / lookups if lookups else 0.0,
+            'encoded_hits': counters.get('encoded_hits', 0),
+            'encoded_misses': counters.get('encoded_misses', 0),
+        }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def _remember(self, video_id, transcript, created_at):
+        self._memory[video_id] = (transcript, created_at)
+        self._memory.move_to_end(video_id)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _remember_encoded(self, key, etag, body):
+        self._encoded[key] = (etag, body)
+        self._encoded.move_to_end(key)
+        while len(self._encoded) > self.max_entries:
+            self._encoded.popitem(last=False)
+
+    # Drop the compressed bodies of a transcript that changed or went away
+    def _forget_encoded(self, video_id):
+        for key in [key for key in self._encoded if key[0] == video_id]:
+            del self._encoded[key]
+        self._db.execute('DELETE FROM encoded_transcripts WHERE video_id = ?', (video_id,))
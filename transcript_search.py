@@ -0,0 +1,118 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Matches are returned per line, with the hit wrapped in these markers
+HIGHLIGHT = ('[', ']')
+
+
+# Function to turn free text into an FTS5 query that matches all of its words,
+# for input that is not valid FTS5 syntax (e.g. "don't" or a stray quote)
+def quote_terms(query):
+    return ' '.join('"' + term.replace('"', '""') + '"' for term in query.split())
+
+
+# Full-text index over every transcript the service has fetched. Transcripts are
+# kept line by line in a plain table, and an external-content FTS5 table indexes
+# them, so the text is stored once and re-indexing a video only touches its own
+# rows. Queries use FTS5 syntax (phrases in double quotes, AND/OR/NOT, prefix*),
+# are stemmed with the porter tokenizer and ranked with BM25.
+class TranscriptIndex:
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.executescript('''
+            CREATE TABLE IF NOT EXISTS videos (
+                video_id TEXT PRIMARY KEY,
+                line_count INTEGER NOT NULL,
+                indexed_at REAL NOT NULL);
+            CREATE TABLE IF NOT EXISTS lines (
+                id INTEGER PRIMARY KEY,
+                video_id TEXT NOT NULL,
+                line INTEGER NOT NULL,
+                text TEXT NOT NULL);
+            CREATE INDEX IF NOT EXISTS lines_video ON lines (video_id);
+            CREATE VIRTUAL TABLE IF NOT EXISTS lines_fts USING fts5(
+                text, content='lines', content_rowid='id',
+                tokenize='porter unicode61 remove_diacritics 2');
+            CREATE TRIGGER IF NOT EXISTS lines_ai AFTER INSERT ON lines BEGIN
+                INSERT INTO lines_fts (rowid, text) VALUES (new.id, new.text);
+            END;
+            CREATE TRIGGER IF NOT EXISTS lines_ad AFTER DELETE ON lines BEGIN
+                INSERT INTO lines_fts (lines_fts, rowid, text) VALUES ('delete', old.id, old.text);
+            END;
+        ''')
+        self._db.commit()
+
+    # Function to add or replace the transcript of a video
+    def add(self, video_id, transcript):
+        lines = [(video_id, number, text) for number, text in enumerate(transcript.split('\n')) if text.strip()]
+        with self._lock, self._db:
+            self._db.execute('DELETE FROM lines WHERE video_id = ?', (video_id,))
+            self._db.executemany('INSERT INTO lines (video_id, line, text) VALUES (?, ?, ?)', lines)
+            self._db.execute(
+                'INSERT OR REPLACE INTO videos (video_id, line_count, indexed_at) VALUES (?, ?, ?)',
+                (video_id, len(lines), time.time()))
+
+    def has(self, video_id):
+        with self._lock:
+            return self._db.execute('SELECT 1 FROM videos WHERE video_id = ?', (video_id,)).fetchone() is not None
+
+    def remove(self, video_id):
+        with self._lock, self._db:
+            self._db.execute('DELETE FROM lines WHERE video_id = ?', (video_id,))
+            self._db.execute('DELETE FROM videos WHERE video_id = ?', (video_id,))
+
+    # Function to find the best matching videos; each comes with its best BM25
+    # score (lower is better, as SQLite reports it) and up to per_video matching
+    # lines, given by their 0-based line number in the transcript
+    def search(self, query, limit=20, per_video=5):
+        try:
+            return self._search(query, limit, per_video)
+        except sqlite3.OperationalError:
+            return self._search(quote_terms(query), limit, per_video)
+
+    def stats(self):
+        with self._lock:
+            videos, lines = self._db.execute('SELECT COUNT(*), COALESCE(SUM(line_count), 0) FROM videos').fetchone()
+        return {'videos': videos, 'lines': lines, 'size_bytes': os.path.getsize(self.path)}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    # Rank videos by their best line first, so one video with many hits cannot
+    # crowd the others out, then fetch the best lines of each
+    def _search(self, query, limit, per_video):
+        with self._lock:
+            videos = self._db.execute(
+                # bm25() is not allowed under an aggregate; rank is the same score as a column
+                'SELECT lines.video_id, MIN(hits.rank) AS best'
+                ' FROM (SELECT rowid, rank FROM lines_fts WHERE lines_fts MATCH ?) AS hits'
+                ' JOIN lines ON lines.id = hits.rowid'
+                ' GROUP BY lines.video_id ORDER BY best LIMIT ?',
+                (query, limit)
+            ).fetchall()
+            results = []
+            for video_id, score in videos:
+                rows = self._db.execute(
+                    'SELECT lines.line, snippet(lines_fts, 0, ?, ?, \'…\', 24)'
+                    ' FROM lines_fts JOIN lines ON lines.id = lines_fts.rowid'
+                    ' WHERE lines_fts MATCH ? AND lines.video_id = ? ORDER BY bm25(lines_fts) LIMIT ?',
+                    (HIGHLIGHT[0], HIGHLIGHT[1], query, video_id, per_video)
+                ).fetchall()
+                results.append({
+                    'video_id': video_id,
+                    'score': round(score, 4),
+                    'matches': [{'line': line, 'snippet': snippet} for line, snippet in rows],
+                })
+        return results
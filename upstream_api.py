@@ -0,0 +1,265 @@
+import json
+import logging
+import os
+import threading
+
+import urllib3
+
+logger = logging.getLogger(__name__)
+
+# Marks where the video ID goes in a captured request
+VIDEO_ID_PLACEHOLDER = '__VIDEO_ID__'
+# Headers that belong to the original connection or are recomputed by the HTTP client
+SKIPPED_HEADERS = {'content-length', 'host', 'connection', 'keep-alive', 'transfer-encoding', 'accept-encoding'}
+# Number of transcript lines compared when locating them in a JSON response
+SAMPLE_LINES = 20
+
+
+# Raised when the captured transcript request cannot be replayed or parsed
+class FastPathError(Exception):
+    pass
+
+
+# Function to collapse whitespace so DOM text and JSON text compare equal
+def normalize_text(text):
+    return ' '.join(str(text).split())
+
+
+# Function to read the CDP network events Chrome buffered in the performance log
+def read_network_events(driver):
+    events = []
+    for entry in driver.get_log('performance'):
+        message = json.loads(entry['message'])['message']
+        if message['method'].startswith('Network.'):
+            events.append(message)
+    return events
+
+
+# Function to throw away the events buffered in the performance log. chromedriver keeps
+# them until they are read, so pooled drivers drain the log before every scrape.
+def discard_network_events(driver):
+    driver.get_log('performance')
+
+
+def _item_text(item, field):
+    if field is None:
+        return item if isinstance(item, str) else None
+    if isinstance(item, dict) and isinstance(item.get(field), str):
+        return item[field]
+    return None
+
+
+# Function to locate the list holding the transcript lines inside a JSON document.
+# Returns (path, field): the keys leading to the list and the key of each item's
+# text (None for a plain list of strings), or None when nothing matches.
+def find_transcript_path(document, lines):
+    wanted = {normalize_text(line) for line in lines[:SAMPLE_LINES] if line.strip()}
+    if not wanted:
+        return None
+    best = None
+
+    def walk(node, path):
+        nonlocal best
+        if isinstance(node, dict):
+            for key, value in node.items():
+                walk(value, path + [key])
+        elif isinstance(node, list) and node:
+            first = node[0]
+            if isinstance(first, str):
+                fields = [None]
+            elif isinstance(first, dict):
+                fields = [key for key, value in first.items() if isinstance(value, str)]
+            else:
+                fields = []
+            for field in fields:
+                hits = sum(
+                    1 for item in node
+                    if _item_text(item, field) is not None and normalize_text(_item_text(item, field)) in wanted
+                )
+                if hits and (best is None or hits > best[0]):
+                    best = (hits, path, field)
+            for index, item in enumerate(node):
+                if isinstance(item, (dict, list)):
+                    walk(item, path + [index])
+
+    walk(document, [])
+    if best is None or best[0] < max(1, len(wanted) // 2):
+        return None
+    return best[1], best[2]
+
+
+# Function to pull the transcript lines out of a JSON document with a learned path
+def extract_lines(document, path, field):
+    node = document
+    try:
+        for key in path:
+            node = node[key]
+    except (KeyError, IndexError, TypeError) as e:
+        raise FastPathError(f"Transcript API response no longer matches the learned shape: {e}") from e
+    if not isinstance(node, list):
+        raise FastPathError("Transcript API response no longer matches the learned shape")
+    lines = []
+    for item in node:
+        text = _item_text(item, field)
+        if text and text.strip():
+            lines.append(text.strip())
+    return lines
+
+
+# Learns the XHR the NoteGPT page uses to fetch a transcript from Chrome's
+# performance log and replays it directly over pooled keep-alive connections.
+# The learned request is kept in a JSON file shared by all workers; when a
+# replay fails the recipe is marked stale and relearned on the next browser run.
+class UpstreamApi:
+    def __init__(self, recipe_path, timeout=15, max_connections=10):
+        self.recipe_path = recipe_path
+        self.http = urllib3.PoolManager(
+            maxsize=max_connections,
+            timeout=urllib3.Timeout(total=timeout),
+            retries=False,
+        )
+        self._lock = threading.Lock()
+        self._stale = False
+        self._mtime = None
+        self._recipe = self._load()
+
+    def needs_capture(self):
+        self._reload_if_changed()
+        with self._lock:
+            return self._recipe is None or self._stale
+
+    def has_recipe(self):
+        self._reload_if_changed()
+        with self._lock:
+            return self._recipe is not None and not self._stale
+
+    # Function to find the transcript request among the network events of a finished browser run
+    def learn(self, driver, video_id, lines):
+        requests = {}
+        extra_headers = {}
+        json_responses = []
+        for event in read_network_events(driver):
+            params = event['params']
+            if event['method'] == 'Network.requestWillBeSent' and params.get('type') in ('XHR', 'Fetch'):
+                requests[params['requestId']] = params['request']
+            elif event['method'] == 'Network.requestWillBeSentExtraInfo':
+                extra_headers[params['requestId']] = params.get('headers', {})
+            elif event['method'] == 'Network.responseReceived':
+                response = params['response']
+                if response.get('status') == 200 and 'json' in response.get('mimeType', ''):
+                    json_responses.append(params['requestId'])
+
+        for request_id in reversed(json_responses):
+            request = requests.get(request_id)
+            if request is None:
+                continue
+            try:
+                body = driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': request_id})
+                if body.get('base64Encoded'):
+                    continue
+                document = json.loads(body['body'])
+            except Exception:
+                continue
+
+            located = find_transcript_path(document, lines)
+            if located is None:
+                continue
+
+            headers = dict(request.get('headers', {}))
+            headers.update(extra_headers.get(request_id, {}))
+            recipe = {
+                'method': request.get('method', 'GET'),
+                'url': request['url'].replace(video_id, VIDEO_ID_PLACEHOLDER),
+                'headers': {
+                    name: value for name, value in headers.items()
+                    if not name.startswith(':') and name.lower() not in SKIPPED_HEADERS
+                },
+                'body': (request.get('postData') or '').replace(video_id, VIDEO_ID_PLACEHOLDER) or None,
+                'path': located[0],
+                'field': located[1],
+            }
+            self._save(recipe)
+            logger.info(f"Learned NoteGPT transcript API: {recipe['method']} {recipe['url']}")
+            return True
+
+        logger.warning('No transcript API request found in the browser network log')
+        return False
+
+    # Function to fetch transcript lines for a video without a browser
+    def fetch(self, video_id):
+        self._reload_if_changed()
+        with self._lock:
+            recipe = self._recipe
+        if recipe is None:
+            raise FastPathError("No transcript API request has been captured yet")
+
+        body = recipe['body']
+        try:
+            response = self.http.request(
+                recipe['method'],
+                recipe['url'].replace(VIDEO_ID_PLACEHOLDER, video_id),
+                body=body.replace(VIDEO_ID_PLACEHOLDER, video_id).encode('utf-8') if body else None,
+                headers=recipe['headers'],
+            )
+        except urllib3.exceptions.HTTPError as e:
+            self._mark_stale()
+            raise FastPathError(f"Transcript API request failed: {e}") from e
+
+        if response.status != 200:
+            self._mark_stale()
+            raise FastPathError(f"Transcript API returned HTTP {response.status}")
+        try:
+            document = json.loads(response.data)
+        except ValueError as e:
+            self._mark_stale()
+            raise FastPathError("Transcript API returned invalid JSON") from e
+
+        try:
+            lines = extract_lines(document, recipe['path'], recipe['field'])
+        except FastPathError:
+            self._mark_stale()
+            raise
+        if not lines:
+            raise FastPathError("Transcript API returned no transcript lines")
+        return lines
+
+    def _mark_stale(self):
+        with self._lock:
+            self._stale = True
+
+    # Pick up a recipe relearned by another worker
+    def _reload_if_changed(self):
+        try:
+            mtime = os.stat(self.recipe_path).st_mtime
+        except FileNotFoundError:
+            return
+        if mtime != self._mtime:
+            recipe = self._load()
+            if recipe is not None:
+                with self._lock:
+                    self._recipe = recipe
+                    self._stale = False
+
+    def _load(self):
+        try:
+            self._mtime = os.stat(self.recipe_path).st_mtime
+            with open(self.recipe_path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except ValueError:
+            logger.error(f"Ignoring unreadable transcript API recipe: {self.recipe_path}")
+            return None
+
+    def _save(self, recipe):
+        directory = os.path.dirname(self.recipe_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.recipe_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(recipe, f, indent=2)
+        os.replace(tmp_path, self.recipe_path)
+        self._mtime = os.stat(self.recipe_path).st_mtime
+        with self._lock:
+            self._recipe = recipe
+            self._stale = False
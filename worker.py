@@ -0,0 +1,40 @@
+import argparse
+import logging
+import os
+import signal
+import threading
+
+# Importing app builds the driver pool, cache and queue from the same settings as
+# the web process; its own in-process job workers are switched off here
+os.environ['JOB_WORKER_THREADS'] = '0'
+
+import app  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+
+# Function to run job workers against the shared queue until SIGINT/SIGTERM
+def main():
+    parser = argparse.ArgumentParser(description='Run transcript job workers')
+    parser.add_argument('--threads', type=int, default=app.BROWSER_SLOTS,
+                        help='Jobs processed concurrently (default: BROWSER_SLOTS)')
+    args = parser.parse_args()
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+    signal.signal(signal.SIGINT, lambda signum, frame: stop.set())
+
+    workers = [threading.Thread(target=app.create_job_worker().run_forever, args=(stop,))
+               for _ in range(args.threads)]
+    for worker in workers:
+        worker.start()
+    logger.info(f'Started {len(workers)} job workers on {app.JOB_QUEUE_PATH}')
+
+    # Let claimed jobs finish; unfinished leases are picked up elsewhere once they expire
+    for worker in workers:
+        worker.join()
+    app.driver_pool.close()
+
+
+if __name__ == '__main__':
+    main()